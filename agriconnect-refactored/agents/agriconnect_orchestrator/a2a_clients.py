@@ -0,0 +1,124 @@
+# agents/agriconnect_orchestrator/a2a_clients.py
+
+import asyncio
+import contextlib
+import logging
+import socket
+
+import httpx
+from a2a.client import A2AClient
+from a2a.types import AgentCard, SendMessageRequest, SendMessageResponse
+
+from common.http_support import HTTP2_AVAILABLE
+from common.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _pooled_sockets(http_client: httpx.AsyncClient) -> list[socket.socket]:
+    """The sockets of the client's open pooled connections (reaches into httpcore's pool)."""
+    sockets = []
+    pool = getattr(http_client._transport, "_pool", None)
+    for connection in getattr(pool, "connections", []):
+        stream = getattr(getattr(connection, "_connection", None), "_network_stream", None)
+        transport_socket = stream.get_extra_info("socket") if stream is not None else None
+        # asyncio hands out a TransportSocket wrapper; close the socket it wraps
+        raw_socket = getattr(transport_socket, "_sock", transport_socket)
+        if isinstance(raw_socket, socket.socket):
+            sockets.append(raw_socket)
+    return sockets
+
+
+async def _close_stale_http_client(http_client: httpx.AsyncClient, loop: asyncio.AbstractEventLoop) -> None:
+    """
+    Closes a client whose connections belong to another event loop. A loop
+    still running in another thread closes it itself; otherwise the
+    connections cannot shut down cleanly, so their sockets are closed here.
+    """
+    if loop.is_running():
+        asyncio.run_coroutine_threadsafe(http_client.aclose(), loop)
+        return
+    sockets = _pooled_sockets(http_client)
+    # Marks the client closed and empties its pool; closing the transports fails on a closed loop
+    with contextlib.suppress(RuntimeError):
+        await http_client.aclose()
+    for raw_socket in sockets:
+        raw_socket.close()
+
+
+class A2AClientRegistry:
+    """
+    Long-lived A2AClients keyed by agent card URL, all sharing one
+    httpx.AsyncClient, so repeat delegations to the same agent go out on a
+    warm keep-alive connection instead of a new client and socket per call.
+    Each request carries its agent's own timeout (by card name, falling back
+    to the default), since one pool serves agents with very different
+    response times.
+    """
+
+    def __init__(self, default_timeout: float, agent_timeouts: dict[str, float]):
+        self.default_timeout = default_timeout
+        self.agent_timeouts = agent_timeouts
+        self._http_client: httpx.AsyncClient | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        # card URL -> (card the client was built from, client)
+        self._clients: dict[str, tuple[AgentCard, A2AClient]] = {}
+        self.created = 0
+        self.reused = 0
+
+    async def _shared_http_client(self) -> httpx.AsyncClient:
+        # Pooled connections belong to the event loop that opened them; start over on a new loop
+        loop = asyncio.get_running_loop()
+        http_client, stale_client, stale_loop = self._http_client, None, None
+        if http_client is None or self._loop is not loop:
+            stale_client, stale_loop = self._http_client, self._loop
+            limits = httpx.Limits(
+                max_connections=settings.ORCHESTRATOR_A2A_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.ORCHESTRATOR_A2A_MAX_KEEPALIVE,
+                keepalive_expiry=settings.ORCHESTRATOR_A2A_KEEPALIVE_EXPIRY,
+            )
+            http_client = httpx.AsyncClient(
+                timeout=self.default_timeout,
+                limits=limits,
+                http2=settings.ORCHESTRATOR_A2A_HTTP2 and HTTP2_AVAILABLE,
+            )
+            self._http_client, self._loop = http_client, loop
+            self._clients = {}
+        # Swapped in before closing the old client, so concurrent callers never see a half-replaced state
+        if stale_client is not None:
+            await _close_stale_http_client(stale_client, stale_loop)
+        return http_client
+
+    def timeout_for(self, agent_card: AgentCard) -> float:
+        return self.agent_timeouts.get(agent_card.name, self.default_timeout)
+
+    async def client_for(self, agent_card: AgentCard) -> A2AClient:
+        """Returns the cached client for the card's URL, rebuilding it if the card changed."""
+        http_client = await self._shared_http_client()
+        entry = self._clients.get(agent_card.url)
+        if entry is not None and entry[0] == agent_card:
+            self.reused += 1
+            return entry[1]
+        client = A2AClient(httpx_client=http_client, agent_card=agent_card)
+        self._clients[agent_card.url] = (agent_card, client)
+        self.created += 1
+        return client
+
+    async def send_message(self, agent_card: AgentCard, request: SendMessageRequest) -> SendMessageResponse:
+        client = await self.client_for(agent_card)
+        return await client.send_message(request, http_kwargs={"timeout": self.timeout_for(agent_card)})
+
+    async def aclose(self) -> None:
+        http_client, self._http_client = self._http_client, None
+        if http_client is not None and self._loop is asyncio.get_running_loop():
+            await http_client.aclose()
+        elif http_client is not None:
+            await _close_stale_http_client(http_client, self._loop)
+        self._clients = {}
+
+    def stats(self) -> dict:
+        return {
+            "agents": len(self._clients),
+            "clients_created": self.created,
+            "clients_reused": self.reused,
+        }
@@ -1,25 +1,64 @@
 import os
+import asyncio
 import httpx
 import logging
 import json
 from uuid import uuid4
 
-from a2a.client import A2AClient
 from a2a.types import SendMessageRequest, MessageSendParams, AgentCard, Message
 
-from mcp import ClientSession
-from mcp.client.sse import sse_client
-
 from google.adk.agents import LlmAgent
 from google.adk.tools import FunctionTool
 
 # Use our new centralized settings
 from common.settings import settings
 
+from .a2a_clients import A2AClientRegistry
+from .mcp_pool import McpSessionPool
+from .routing_cache import RoutingCache
+
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Shared by every call_agent invocation, so agent discovery reuses initialized MCP sessions
+mcp_session_pool = McpSessionPool(
+    f"{settings.MCP_SERVER_URL}/sse",
+    size=settings.ORCHESTRATOR_MCP_POOL_SIZE,
+    idle_ping_interval=settings.ORCHESTRATOR_MCP_IDLE_PING_INTERVAL,
+)
+# Routing decisions from find_agent, reused for repeat task descriptions
+routing_cache = RoutingCache(
+    max_entries=settings.ORCHESTRATOR_ROUTING_CACHE_SIZE,
+    ttl=settings.ORCHESTRATOR_ROUTING_CACHE_TTL,
+)
+# One A2A client per discovered agent, sharing a single httpx connection pool
+a2a_clients = A2AClientRegistry(
+    default_timeout=settings.ORCHESTRATOR_A2A_TIMEOUT,
+    agent_timeouts=settings.ORCHESTRATOR_A2A_AGENT_TIMEOUTS,
+)
+_cards_version_task: asyncio.Task | None = None
+
+async def watch_cards_version() -> None:
+    """Polls the MCP server's agent cards version and invalidates cached routes when it changes."""
+    while True:
+        try:
+            tool_result = await mcp_session_pool.call_tool(name='router_stats', arguments={})
+            stats = json.loads(tool_result.content[0].text)
+            routing_cache.set_cards_version(stats.get('agent_index', {}).get('cards_version'))
+        except Exception as e:
+            logger.warning(f"Could not check the agent cards version on the MCP server: {e!r}")
+        await asyncio.sleep(settings.ORCHESTRATOR_ROUTING_CACHE_VERSION_INTERVAL)
+
+def ensure_cards_version_watch() -> None:
+    global _cards_version_task
+    if settings.ORCHESTRATOR_ROUTING_CACHE_SIZE <= 0 or settings.ORCHESTRATOR_ROUTING_CACHE_VERSION_INTERVAL <= 0:
+        return
+    # A task left on a previous, closed event loop never finishes; start a new one on this loop
+    task = _cards_version_task
+    if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+        _cards_version_task = asyncio.create_task(watch_cards_version())
+
 async def call_agent(task_description: str) -> str:
     """
     Finds the best specialist agent via MCP and calls it through the MCP proxy.
@@ -33,72 +72,77 @@ async def call_agent(task_description: str) -> str:
     logger.info(f"Orchestrator received task: '{task_description[:70]}...'")
     
     agent_card_json_str = ""
+    agent_card = None
     mcp_sse_url = f"{settings.MCP_SERVER_URL}/sse"
 
     try:
-        # Step 1: Connect to MCP server to find the right agent
-        logger.info(f"Connecting to MCP server at {mcp_sse_url} to find an agent.")
-        async with sse_client(mcp_sse_url, timeout=30) as (reader, writer):
-            async with ClientSession(read_stream=reader, write_stream=writer) as session:
-                await session.initialize()
-                tool_result = await session.call_tool(
-                    name='find_agent',
-                    arguments={'query': task_description}
-                )
-                agent_card_json_str = tool_result.content[0].text
-
-        if not agent_card_json_str:
-            raise ValueError("MCP server did not return an agent card.")
-
-        # Step 2: Parse the agent card. The URL will now be the MCP proxy URL.
-        agent_card_data = json.loads(agent_card_json_str)
-        if "error" in agent_card_data:
-            raise ValueError(f"MCP Server Error: {agent_card_data['error']}")
-
-        agent_card = AgentCard(**agent_card_data)
-        logger.info(f"MCP server selected agent: '{agent_card.name}' at proxy URL: {agent_card.url}")
+        ensure_cards_version_watch()
+        agent_card = routing_cache.get(task_description)
+        if agent_card is not None:
+            logger.info(f"Routing cache hit (hit ratio {routing_cache.stats()['hit_ratio']}): reusing agent '{agent_card.name}' at proxy URL: {agent_card.url}")
+        else:
+            # Step 1: Ask the MCP server (over a pooled session) to find the right agent
+            logger.info(f"Asking MCP server at {mcp_sse_url} to find an agent.")
+            tool_result = await mcp_session_pool.call_tool(
+                name='find_agent',
+                arguments={'query': task_description}
+            )
+            agent_card_json_str = tool_result.content[0].text
+
+            if not agent_card_json_str:
+                raise ValueError("MCP server did not return an agent card.")
+
+            # Step 2: Parse the agent card. The URL will now be the MCP proxy URL.
+            agent_card_data = json.loads(agent_card_json_str)
+            if "error" in agent_card_data:
+                raise ValueError(f"MCP Server Error: {agent_card_data['error']}")
+
+            agent_card = AgentCard(**agent_card_data)
+            routing_cache.put(task_description, agent_card)
+            logger.info(f"MCP server selected agent: '{agent_card.name}' at proxy URL: {agent_card.url}")
         
         # Step 3: Use the discovered agent card to make an A2A call.
-        # The A2AClient will transparently call the proxy URL provided in the card.
-        async with httpx.AsyncClient(timeout=300.0) as httpx_client:
-            a2a_client = A2AClient(httpx_client=httpx_client, agent_card=agent_card)
-
-            message_to_send = Message(
-                role='user',
-                parts=[{'kind': 'text', 'text': task_description}],
-                messageId=str(uuid4()),
-                contextId=str(uuid4()), # Create a unique context/session for this call
-            )
-            request = SendMessageRequest(
-                id=str(uuid4()),
-                params=MessageSendParams(message=message_to_send)
-            )
-            
-            logger.info(f"Sending A2A request to agent '{agent_card.name}' via its proxy URL.")
-            response_record = await a2a_client.send_message(request)
-            response_dict = response_record.model_dump(mode='json')
-
-            if 'error' in response_dict:
-                return f"Agent returned an error: {response_dict['error'].get('message')}"
-
-            # Correctly parse the nested A2A response
-            result_data = response_dict.get('result', {})
-            status_data = result_data.get('status', {})
-            message_data = status_data.get('message', {})
-            parts_data = message_data.get('parts', [])
-            
-            if parts_data:
-                response_text = parts_data[0].get('text', 'Agent returned an empty response.')
-                logger.info(f"Received final text from '{agent_card.name}': '{response_text[:100]}...'")
-                return response_text
-            else:
-                return "Agent completed the task but returned no text content."
+        # The registry reuses this agent's A2AClient and a warm connection to the proxy URL in the card.
+        message_to_send = Message(
+            role='user',
+            parts=[{'kind': 'text', 'text': task_description}],
+            messageId=str(uuid4()),
+            contextId=str(uuid4()), # Create a unique context/session for this call
+        )
+        request = SendMessageRequest(
+            id=str(uuid4()),
+            params=MessageSendParams(message=message_to_send)
+        )
+        
+        logger.info(f"Sending A2A request to agent '{agent_card.name}' via its proxy URL.")
+        response_record = await a2a_clients.send_message(agent_card, request)
+        response_dict = response_record.model_dump(mode='json')
+
+        if 'error' in response_dict:
+            return f"Agent returned an error: {response_dict['error'].get('message')}"
+
+        # Correctly parse the nested A2A response
+        result_data = response_dict.get('result', {})
+        status_data = result_data.get('status', {})
+        message_data = status_data.get('message', {})
+        parts_data = message_data.get('parts', [])
+        
+        if parts_data:
+            response_text = parts_data[0].get('text', 'Agent returned an empty response.')
+            logger.info(f"Received final text from '{agent_card.name}': '{response_text[:100]}...'")
+            return response_text
+        else:
+            return "Agent completed the task but returned no text content."
 
     except httpx.ConnectError as e:
+        if agent_card is not None:
+            routing_cache.invalidate(agent_card.name)
         error_msg = f"Connection Error: Could not connect to the MCP server at {mcp_sse_url}. Is it running? Details: {e}"
         logger.error(error_msg)
         return error_msg
     except Exception as e:
+        if agent_card is not None:
+            routing_cache.invalidate(agent_card.name)
         error_msg = f"An unexpected error occurred during orchestration: {e}"
         logger.exception(error_msg)
         return error_msg
@@ -0,0 +1,183 @@
+# agents/agriconnect_orchestrator/mcp_pool.py
+
+import asyncio
+import logging
+import time
+
+import anyio
+import httpx
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+
+from common.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean the session's connection is broken, rather than the call failing on a healthy session
+TRANSPORT_ERRORS = (
+    OSError,
+    httpx.TransportError,
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+)
+
+
+def _is_transport_error(error: BaseException) -> bool:
+    # TimeoutError is an OSError since Python 3.11, but a slow call says nothing about the connection
+    return isinstance(error, TRANSPORT_ERRORS) and not isinstance(error, asyncio.TimeoutError)
+
+
+class _PooledSession:
+    """
+    One initialized MCP session kept open by its own background task: the
+    SSE transport must be entered and exited in the same task, while tool
+    calls can come from any task and share the session concurrently.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.session: ClientSession | None = None
+        self.error: BaseException | None = None
+        self.in_use = 0
+        self.last_used = time.monotonic()
+        self._ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    @property
+    def alive(self) -> bool:
+        return not self._task.done() and self.error is None
+
+    async def _run(self) -> None:
+        try:
+            async with sse_client(self.url, timeout=settings.ORCHESTRATOR_MCP_CALL_TIMEOUT) as (reader, writer):
+                async with ClientSession(read_stream=reader, write_stream=writer) as session:
+                    await session.initialize()
+                    self.session = session
+                    self._ready.set()
+                    await self._stop.wait()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.session = None
+            self._ready.set()
+
+    async def wait_ready(self) -> ClientSession:
+        await asyncio.wait_for(self._ready.wait(), timeout=settings.ORCHESTRATOR_MCP_CALL_TIMEOUT)
+        if self.session is None:
+            raise self.error or ConnectionError(f"MCP session to {self.url} closed")
+        return self.session
+
+    async def close(self) -> None:
+        self._stop.set()
+        try:
+            await asyncio.wait_for(self._task, timeout=5)
+        except Exception:
+            self._task.cancel()
+
+
+class McpSessionPool:
+    """
+    Process-wide pool of initialized MCP client sessions, so agent discovery
+    costs one tool-call RPC instead of an SSE connect plus an initialize
+    handshake. Calls go to the least busy live session (opening up to
+    `size`), sessions that fail to connect or whose connection breaks are
+    replaced and the call retried once, and idle sessions are pinged in the
+    background so dead ones are dropped. A tool error or a call timeout is
+    raised to the caller and leaves the session in the pool.
+    """
+
+    def __init__(self, url: str, size: int, idle_ping_interval: float):
+        self.url = url
+        self.size = max(size, 1)
+        self.idle_ping_interval = idle_ping_interval
+        self._sessions: list[_PooledSession] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._health_task: asyncio.Task | None = None
+        self.connects = 0
+        self.calls = 0
+        self.reconnects = 0
+
+    def _bind_loop(self) -> None:
+        # Sessions belong to the event loop that opened them; start over on a new loop
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._sessions = []
+            self._health_task = None
+        if self._health_task is None and self.idle_ping_interval > 0:
+            self._health_task = asyncio.create_task(self._health_check_loop())
+
+    def _pick(self) -> _PooledSession:
+        self._sessions = [s for s in self._sessions if s.alive]
+        least_busy = min(self._sessions, key=lambda s: s.in_use, default=None)
+        if least_busy is None or (least_busy.in_use > 0 and len(self._sessions) < self.size):
+            least_busy = _PooledSession(self.url)
+            self._sessions.append(least_busy)
+            self.connects += 1
+        return least_busy
+
+    async def call_tool(self, name: str, arguments: dict):
+        """Calls an MCP tool on a pooled session, reconnecting once if the session has failed."""
+        self._bind_loop()
+        self.calls += 1
+        for attempt in (1, 2):
+            pooled = self._pick()
+            pooled.in_use += 1
+            try:
+                try:
+                    session = await pooled.wait_ready()
+                except Exception as e:
+                    raise ConnectionError(f"Could not open MCP session to {self.url}: {e!r}") from e
+                return await asyncio.wait_for(
+                    session.call_tool(name=name, arguments=arguments),
+                    timeout=settings.ORCHESTRATOR_MCP_CALL_TIMEOUT,
+                )
+            except Exception as e:
+                if not _is_transport_error(e) and pooled.alive:
+                    raise  # The call failed or timed out, but the session is still usable
+                await self._discard(pooled)
+                if attempt == 2:
+                    raise
+                logger.warning(f"MCP session to {self.url} failed ({e!r}); reconnecting.")
+                self.reconnects += 1
+            finally:
+                pooled.in_use -= 1
+                pooled.last_used = time.monotonic()
+
+    async def _discard(self, pooled: _PooledSession) -> None:
+        if pooled in self._sessions:
+            self._sessions.remove(pooled)
+        await pooled.close()
+
+    async def _health_check_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.idle_ping_interval)
+            now = time.monotonic()
+            for pooled in list(self._sessions):
+                if pooled.in_use or now - pooled.last_used < self.idle_ping_interval:
+                    continue
+                try:
+                    session = await pooled.wait_ready()
+                    await asyncio.wait_for(session.send_ping(), timeout=settings.ORCHESTRATOR_MCP_CALL_TIMEOUT)
+                    pooled.last_used = time.monotonic()
+                except Exception as e:
+                    logger.warning(f"Dropping idle MCP session to {self.url}: ping failed ({e!r})")
+                    await self._discard(pooled)
+
+    async def aclose(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        for pooled in self._sessions:
+            await pooled.close()
+        self._sessions = []
+
+    def stats(self) -> dict:
+        return {
+            "open_sessions": sum(1 for s in self._sessions if s.alive),
+            "connects": self.connects,
+            "calls": self.calls,
+            "reconnects": self.reconnects,
+        }
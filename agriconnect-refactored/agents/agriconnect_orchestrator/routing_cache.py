@@ -0,0 +1,87 @@
+# agents/agriconnect_orchestrator/routing_cache.py
+
+import logging
+import time
+from collections import OrderedDict
+
+from a2a.types import AgentCard
+
+from common.text import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+class RoutingCache:
+    """
+    Bounded LRU cache of routing decisions: normalized task description ->
+    the AgentCard find_agent chose for it, with a TTL. A hit lets call_agent
+    skip MCP discovery entirely. Entries are dropped per agent when a call to
+    that agent fails, and all at once when the MCP server reports a new
+    cards_version (or on invalidate()).
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # normalized task -> (agent card, stored_at monotonic time)
+        self._entries: OrderedDict[str, tuple[AgentCard, float]] = OrderedDict()
+        self.cards_version: str | None = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, task_description: str) -> AgentCard | None:
+        key = normalize_text(task_description)
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        if entry is not None:
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, task_description: str, agent_card: AgentCard) -> None:
+        if self.max_entries <= 0:
+            return
+        key = normalize_text(task_description)
+        self._entries[key] = (agent_card, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, agent_name: str | None = None) -> int:
+        """Drops the cached routes to one agent, or all of them. Returns how many were dropped."""
+        if agent_name is None:
+            dropped = len(self._entries)
+            self._entries.clear()
+        else:
+            stale = [key for key, (card, _) in self._entries.items() if card.name == agent_name]
+            for key in stale:
+                del self._entries[key]
+            dropped = len(stale)
+        if dropped:
+            self.invalidations += 1
+            logger.info(f"Routing cache invalidated {dropped} entries (agent: {agent_name or 'all'})")
+        return dropped
+
+    def set_cards_version(self, version: str | None) -> None:
+        """Invalidation hook for agent card changes: a new version clears every cached route."""
+        if version is None or version == self.cards_version:
+            return
+        if self.cards_version is not None:
+            logger.info(f"Agent cards changed on the MCP server ({self.cards_version} -> {version})")
+            self.invalidate()
+        self.cards_version = version
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations,
+            "cards_version": self.cards_version,
+        }
@@ -0,0 +1,8 @@
+# agriconnect-refactored/common/http_support.py
+
+# HTTP/2 support in httpx needs the optional 'h2' package.
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
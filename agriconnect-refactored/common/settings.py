@@ -50,6 +50,42 @@ class Settings(BaseSettings):
     MCP_SERVER_HOST: str = "localhost"
     MCP_SERVER_PORT: int = 10000
     MCP_SERVER_URL: str
+    # Content-addressed cache of agent card embeddings (.npy files); empty disables it
+    MCP_EMBEDDING_CACHE_DIR: str = ".cache/embeddings"
+    MCP_EMBEDDING_BATCH_SIZE: int = 100 # Texts per embed request (the API's batch limit)
+    MCP_EMBEDDING_MAX_RETRIES: int = 3
+    MCP_EMBEDDING_RETRY_BACKOFF: float = 1.0 # Seconds before the first retry, doubled each time
+    # Card texts that still could not be embedded are retried by the card watcher, backing off per text
+    # from MCP_CARDS_RELOAD_INTERVAL; a text rejected this many times waits until its card is edited
+    MCP_EMBEDDING_TEXT_MAX_FAILURES: int = 5
+    MCP_EMBEDDING_TEXT_RETRY_MAX_DELAY: float = 600.0
+    # LRU/TTL cache of find_agent query embeddings; set the file to persist it across restarts
+    MCP_QUERY_CACHE_SIZE: int = 1024
+    MCP_QUERY_CACHE_TTL: float = 86400.0
+    MCP_QUERY_CACHE_FILE: str = ""
+    # Default cosine similarity below which find_agents reports no confident match
+    MCP_MIN_MATCH_SCORE: float = 0.5
+    MCP_EMBEDDING_WORKERS: int = 8 # Threads for concurrent query embedding calls
+    MCP_EMBEDDING_TIMEOUT: float = 10.0 # Seconds per query embedding call
+    MCP_QUERY_BATCH_WINDOW_MS: float = 5.0 # Micro-batching window for query embeddings; 0 disables it
+    MCP_QUERY_BATCH_MAX: int = 32 # Flush a batch early once this many queries are waiting
+    # BM25 routing over card tags/skills/examples; a clear lexical winner skips the embedding call
+    MCP_LEXICAL_ROUTING: bool = True
+    MCP_LEXICAL_MIN_SCORE: float = 1.0 # Minimum BM25 score of the winning card
+    MCP_LEXICAL_MARGIN: float = 2.0 # The winner must score this many times the runner-up
+    MCP_LEXICAL_MIN_COVERAGE: float = 0.6 # ...and contain this share of the query's terms
+    MCP_HYBRID_LEXICAL_WEIGHT: float = 0.3 # Weight of relative BM25 vs cosine in hybrid scoring
+    # One vector per skill description and example (plus the card summary) instead of one per card
+    MCP_MULTI_VECTOR: bool = True
+    MCP_MULTI_VECTOR_TOP_M: int = 1 # 1 = max similarity; m > 1 = mean of a card's m best vectors
+    MCP_CARDS_RELOAD_INTERVAL: float = 10.0 # Seconds between agent_cards change scans; 0 disables hot reload
+    # IVF approximate nearest-neighbour search once the index holds this many vectors; 0 disables it
+    MCP_ANN_MIN_VECTORS: int = 2048
+    MCP_ANN_PROBES: int = 8 # Inverted lists scanned per query
+    MCP_ANN_CANDIDATES: int = 64 # Nearest vectors scored exactly and aggregated per card
+    # Embedding backend for routing: 'google' (Gemini API) or 'local' (offline hashed n-gram projections)
+    MCP_EMBEDDING_PROVIDER: str = "google"
+    MCP_LOCAL_EMBEDDING_DIM: int = 512
 
     GATEWAY_SERVER_HOST: str = "localhost"
     GATEWAY_SERVER_PORT: int = 9000
@@ -59,9 +95,83 @@ class Settings(BaseSettings):
     PRICE_PREDICTION_AGENT_URL: str
     BUYER_MATCHING_AGENT_URL: str
     TRADE_COORDINATION_AGENT_URL: str
-    
+
+    # Extra replicas behind the gateway (JSON lists in the environment, e.g. '["http://host:10011/"]')
+    PRICE_PREDICTION_AGENT_REPLICAS: list[str] = []
+    BUYER_MATCHING_AGENT_REPLICAS: list[str] = []
+    TRADE_COORDINATION_AGENT_REPLICAS: list[str] = []
+    # Optional JSON file mapping agent name -> list of replica URLs (overrides the above)
+    GATEWAY_AGENT_REGISTRY_FILE: str | None = None
+    # Host the three agents' A2A apps inside the gateway process instead of as separate servers
+    GATEWAY_INPROCESS_AGENTS: bool = False
+
+    # Orchestrator: persistent MCP client sessions shared by concurrent call_agent invocations
+    ORCHESTRATOR_MCP_POOL_SIZE: int = 2 # Max open sessions; extra concurrent calls share them
+    ORCHESTRATOR_MCP_IDLE_PING_INTERVAL: float = 30.0 # Ping sessions idle this long (seconds); 0 disables it
+    ORCHESTRATOR_MCP_CALL_TIMEOUT: float = 30.0 # Seconds for connecting and for each tool call
+    # Orchestrator: cache of task -> chosen agent card, so repeat tasks skip find_agent; size 0 disables it
+    ORCHESTRATOR_ROUTING_CACHE_SIZE: int = 512
+    ORCHESTRATOR_ROUTING_CACHE_TTL: float = 600.0 # Seconds a cached routing decision stays valid
+    ORCHESTRATOR_ROUTING_CACHE_VERSION_INTERVAL: float = 30.0 # Seconds between agent card version checks; 0 disables them
+    # Orchestrator: A2A clients reused per agent card URL over one shared connection pool
+    ORCHESTRATOR_A2A_TIMEOUT: float = 300.0
+    ORCHESTRATOR_A2A_AGENT_TIMEOUTS: dict[str, float] = {} # Per-agent overrides by card name, e.g. '{"smart_price_prediction_agent_v2": 120}'
+    ORCHESTRATOR_A2A_MAX_CONNECTIONS: int = 100
+    ORCHESTRATOR_A2A_MAX_KEEPALIVE: int = 20
+    ORCHESTRATOR_A2A_KEEPALIVE_EXPIRY: float = 30.0
+    ORCHESTRATOR_A2A_HTTP2: bool = True # Only used when the 'h2' package is installed
+
     # --- CHANGE: Add LOG_FILE_PATH to settings ---
     LOG_FILE_PATH: str = "app.log" # Keep it consistent with logger_config.py
+    LOG_FOLLOW_POLL_INTERVAL: float = 1.0 # Seconds between checks for new lines in /logs?follow=true
+
+    # Gateway upstream connection pool (one long-lived pool per backend)
+    GATEWAY_UPSTREAM_TIMEOUT: float = 300.0
+    GATEWAY_HTTP2: bool = True # Only used when the 'h2' package is installed
+    GATEWAY_POOL_MAX_CONNECTIONS: int = 100
+    GATEWAY_POOL_MAX_KEEPALIVE: int = 20
+    GATEWAY_POOL_KEEPALIVE_EXPIRY: float = 30.0
+    # Relay /invoke/ request and response bodies as streams instead of buffering them
+    GATEWAY_STREAMING_PASSTHROUGH: bool = True
+
+    # Gateway replica health checks and ejection
+    GATEWAY_HEALTH_CHECK_PATH: str = "/.well-known/agent.json"
+    GATEWAY_HEALTH_CHECK_INTERVAL: float = 10.0 # Seconds; 0 disables active checks
+    GATEWAY_HEALTH_CHECK_TIMEOUT: float = 2.0
+    GATEWAY_REPLICA_EJECT_AFTER_FAILURES: int = 2
+    GATEWAY_REPLICA_EJECTION_SECONDS: float = 30.0
+    GATEWAY_AFFINITY_MAX_ENTRIES: int = 100000 # Task/context ids remembered for routing follow-ups to their replica
+
+    # Gateway response cache (opt-in per agent, e.g. '{"smart_price_prediction_agent_v2": 600}')
+    GATEWAY_CACHE_TTLS: dict[str, float] = {}
+    GATEWAY_CACHE_MAX_BYTES: int = 16 * 1024 * 1024
+    # Opt-in: agents whose identical concurrent message/send calls share one upstream run
+    # (e.g. '["smart_price_prediction_agent_v2"]'); only for agents whose replies do not depend on the conversation
+    GATEWAY_COALESCE_AGENTS: list[str] = []
+
+    # Gateway admission control: concurrent upstream calls and queued callers per agent
+    GATEWAY_MAX_CONCURRENCY: int = 16
+    GATEWAY_MAX_QUEUE: int = 64
+    GATEWAY_QUEUE_TIMEOUT: float = 30.0 # Seconds a caller may wait for a slot
+    GATEWAY_AGENT_MAX_CONCURRENCY: dict[str, int] = {} # Per-agent overrides
+    GATEWAY_AGENT_MAX_QUEUE: dict[str, int] = {}
+
+    # Gateway per-agent circuit breaker
+    GATEWAY_BREAKER_WINDOW: int = 20 # Most recent calls considered
+    GATEWAY_BREAKER_MIN_CALLS: int = 5 # Calls needed in the window before the circuit can open
+    GATEWAY_BREAKER_FAILURE_RATE: float = 0.5
+    GATEWAY_BREAKER_SLOW_CALL_SECONDS: float = 120.0
+    GATEWAY_BREAKER_SLOW_CALL_RATE: float = 0.8
+    GATEWAY_BREAKER_OPEN_SECONDS: float = 30.0
+    GATEWAY_BREAKER_HALF_OPEN_PROBES: int = 2
+
+    # Gateway hedged requests (opt-in per agent; needs 2+ replicas and idempotent calls)
+    GATEWAY_HEDGE_AGENTS: list[str] = []
+    GATEWAY_HEDGE_PERCENTILE: float = 0.95 # Hedge once the call is slower than this latency percentile
+    GATEWAY_HEDGE_DEFAULT_DELAY: float = 30.0 # Seconds, until enough latency samples exist
+    GATEWAY_HEDGE_MIN_DELAY: float = 1.0
+    GATEWAY_HEDGE_MIN_SAMPLES: int = 20
+    GATEWAY_HEDGE_BUDGET: float = 0.1 # Max extra requests from hedging, as a fraction of requests
 
 settings = Settings()
 
@@ -0,0 +1,15 @@
+# agriconnect-refactored/common/text.py
+
+import re
+import unicodedata
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Case-folds, collapses whitespace and drops trailing punctuation, so
+    trivially different phrasings of a request share one cache key.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return _WHITESPACE_RE.sub(" ", text).strip().rstrip("?!. ")
@@ -0,0 +1,160 @@
+# agriconnect-refactored/gateway_server/a2a_payload.py
+
+import json
+from uuid import uuid4
+
+from common.text import normalize_text
+
+
+def parse_jsonrpc_request(body: bytes) -> dict | None:
+    """Returns the JSON-RPC request object in the body, or None if it is not one."""
+    try:
+        payload = json.loads(body)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(payload, dict) or not isinstance(payload.get("method"), str):
+        return None
+    return payload
+
+
+def parse_send_message_request(body: bytes) -> dict | None:
+    """
+    Returns the JSON-RPC payload if the body is a non-streaming A2A
+    `message/send` request, otherwise None.
+    """
+    payload = parse_jsonrpc_request(body)
+    if payload is None or payload.get("method") != "message/send":
+        return None
+    params = payload.get("params")
+    if not isinstance(params, dict) or not isinstance(params.get("message"), dict):
+        return None
+    return payload
+
+
+def affinity_keys(payload: dict) -> list[str]:
+    """
+    The tasks and conversation a request refers to, as 'task:<id>' and
+    'context:<id>' keys (tasks first). Only the replica that created a task
+    or holds a context's session can serve requests about it.
+    """
+    method, params = payload.get("method"), payload.get("params")
+    if not isinstance(params, dict):
+        return []
+    keys = []
+    if method in ("message/send", "message/stream"):
+        message = params.get("message")
+        if not isinstance(message, dict):
+            return []
+        if message.get("taskId"):
+            keys.append(f"task:{message['taskId']}")
+        keys.extend(f"task:{task_id}" for task_id in message.get("referenceTaskIds") or [])
+        if message.get("contextId"):
+            keys.append(f"context:{message['contextId']}")
+    elif method.startswith("tasks/"):
+        # tasks/get, cancel and resubscribe name the task 'id'; push notification configs use 'taskId'
+        task_id = params.get("taskId") or params.get("id")
+        if task_id:
+            keys.append(f"task:{task_id}")
+    return keys
+
+
+def response_affinity_keys(data) -> list[str]:
+    """The task and context ids in one JSON-RPC response or SSE event, as affinity keys."""
+    result = data.get("result") if isinstance(data, dict) else None
+    if not isinstance(result, dict):
+        return []
+    keys = []
+    task_id = result.get("id") if result.get("kind") == "task" else result.get("taskId")
+    if task_id:
+        keys.append(f"task:{task_id}")
+    if result.get("contextId"):
+        keys.append(f"context:{result['contextId']}")
+    return keys
+
+
+def carries_task_reference(payload: dict) -> bool:
+    """True for messages that continue or refer to existing tasks (their reply depends on that task's state)."""
+    message = payload["params"]["message"]
+    return bool(message.get("taskId") or message.get("referenceTaskIds"))
+
+
+def extract_user_text(payload: dict) -> str:
+    """Joins the text parts of the user message in a SendMessageRequest."""
+    parts = payload["params"]["message"].get("parts") or []
+    return " ".join(
+        part.get("text", "") for part in parts
+        if isinstance(part, dict) and part.get("kind", "text") == "text"
+    )
+
+
+def extract_region(payload: dict, headers) -> str:
+    """Region hint from message/params metadata, falling back to the X-Region header."""
+    params = payload.get("params", {})
+    for metadata in (params["message"].get("metadata"), params.get("metadata")):
+        if isinstance(metadata, dict) and metadata.get("region"):
+            return normalize_text(str(metadata["region"]))
+    return normalize_text(headers.get("x-region", ""))
+
+
+def is_completed_task_response(body: bytes) -> bool:
+    """True for a JSON-RPC success whose task (or direct message) is complete."""
+    try:
+        data = json.loads(body)
+    except (ValueError, UnicodeDecodeError):
+        return False
+    if not isinstance(data, dict) or "error" in data or not isinstance(data.get("result"), dict):
+        return False
+    result = data["result"]
+    if result.get("kind") == "message":
+        return True
+    return result.get("status", {}).get("state") == "completed"
+
+
+def rewrite_response_ids(body: bytes, payload: dict) -> bytes:
+    """
+    Makes a shared A2A response valid for another caller: the JSON-RPC id is
+    the caller's, the task gets a fresh id, the caller's contextId (or a new
+    one) is used throughout, and agent messages get fresh messageIds.
+    A body that is not a JSON object is returned unchanged.
+    """
+    try:
+        data = json.loads(body)
+    except (ValueError, UnicodeDecodeError):
+        return body  # e.g. a plain-text error page
+    if not isinstance(data, dict):
+        return body
+    data["id"] = payload.get("id")
+    message = payload["params"]["message"]
+    ids = {
+        "task_id": str(uuid4()),
+        "context_id": message.get("contextId") or str(uuid4()),
+        "user_message_id": message.get("messageId"),
+    }
+    if isinstance(data.get("result"), dict):
+        _rewrite_ids(data["result"], ids)
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def _rewrite_ids(node, ids: dict) -> None:
+    if isinstance(node, list):
+        for item in node:
+            _rewrite_ids(item, ids)
+        return
+    if not isinstance(node, dict):
+        return
+    if node.get("kind") == "task" and "id" in node:
+        node["id"] = ids["task_id"]
+    if "taskId" in node:
+        node["taskId"] = ids["task_id"]
+    if "contextId" in node:
+        node["contextId"] = ids["context_id"]
+    if "messageId" in node:
+        if node.get("role") == "user" and ids["user_message_id"]:
+            node["messageId"] = ids["user_message_id"]
+        else:
+            node["messageId"] = str(uuid4())
+    if "artifactId" in node:
+        node["artifactId"] = str(uuid4())
+    for value in node.values():
+        if isinstance(value, (dict, list)):
+            _rewrite_ids(value, ids)
@@ -0,0 +1,125 @@
+# agriconnect-refactored/gateway_server/admission.py
+
+import asyncio
+import logging
+import math
+import time
+
+from common.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest sample in the moving averages below
+EWMA_ALPHA = 0.2
+MAX_RETRY_AFTER_SECONDS = 300
+
+
+class AdmissionRejected(Exception):
+    """Raised when an agent's wait queue is full or the wait timed out."""
+
+    def __init__(self, agent_name: str, reason: str, retry_after: int):
+        super().__init__(f"Agent '{agent_name}' is overloaded: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AgentAdmission:
+    """
+    Concurrency limit plus bounded FIFO wait queue for one agent, so bursts are
+    shed with 429s at the gateway instead of piling up long-lived upstream calls.
+    """
+
+    def __init__(self, agent_name: str, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.agent_name = agent_name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.total_wait_s = 0.0
+        self.max_wait_s = 0.0
+        self.hold_ewma_s: float | None = None
+
+    def _retry_after(self) -> int:
+        """Rough time until a slot frees up for a new caller, from the average hold time."""
+        if self.hold_ewma_s is None:
+            return 1
+        estimate = self.hold_ewma_s * (self.waiting + 1) / self.max_concurrency
+        return min(max(math.ceil(estimate), 1), MAX_RETRY_AFTER_SECONDS)
+
+    async def acquire(self) -> float:
+        """Waits for a slot and returns the admission time, or raises AdmissionRejected."""
+        queued_at = time.perf_counter()
+        # locked() is also True while others are queued, so newcomers never jump the queue
+        if self._semaphore.locked():
+            if self.waiting >= self.max_queue:
+                self.rejected_queue_full += 1
+                raise AdmissionRejected(self.agent_name, "wait queue is full", self._retry_after())
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected_timeout += 1
+                raise AdmissionRejected(
+                    self.agent_name, f"no slot within {self.queue_timeout}s", self._retry_after()
+                ) from None
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+
+        admitted_at = time.perf_counter()
+        waited = admitted_at - queued_at
+        self.active += 1
+        self.admitted += 1
+        self.total_wait_s += waited
+        self.max_wait_s = max(self.max_wait_s, waited)
+        return admitted_at
+
+    def release(self, admitted_at: float) -> None:
+        """Frees the slot taken by acquire()."""
+        held = time.perf_counter() - admitted_at
+        if self.hold_ewma_s is None:
+            self.hold_ewma_s = held
+        else:
+            self.hold_ewma_s += EWMA_ALPHA * (held - self.hold_ewma_s)
+        self.active -= 1
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "avg_wait_ms": round(self.total_wait_s / self.admitted * 1000, 1) if self.admitted else None,
+            "max_wait_ms": round(self.max_wait_s * 1000, 1),
+        }
+
+
+class AdmissionController:
+    """One AgentAdmission per agent name, sized from settings."""
+
+    def __init__(self, agent_names):
+        self._agents = {
+            name: AgentAdmission(
+                name,
+                max_concurrency=settings.GATEWAY_AGENT_MAX_CONCURRENCY.get(name, settings.GATEWAY_MAX_CONCURRENCY),
+                max_queue=settings.GATEWAY_AGENT_MAX_QUEUE.get(name, settings.GATEWAY_MAX_QUEUE),
+                queue_timeout=settings.GATEWAY_QUEUE_TIMEOUT,
+            )
+            for name in agent_names
+        }
+
+    def get(self, agent_name: str) -> AgentAdmission:
+        return self._agents[agent_name]
+
+    def stats(self) -> dict:
+        return {name: admission.stats() for name, admission in self._agents.items()}
@@ -0,0 +1,122 @@
+# agriconnect-refactored/gateway_server/circuit_breaker.py
+
+import logging
+import math
+import time
+from collections import deque
+
+from common.settings import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling an agent whose circuit is open."""
+
+    def __init__(self, agent_name: str, retry_after: int):
+        super().__init__(f"Circuit for agent '{agent_name}' is open")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Per-agent circuit breaker over a rolling window of recent calls.
+
+    - closed: calls flow; the circuit opens when the failure rate or the slow
+      call rate in the window crosses its threshold.
+    - open: calls fail fast with CircuitOpen for GATEWAY_BREAKER_OPEN_SECONDS.
+    - half_open: a few probe calls are let through; if they all succeed the
+      circuit closes, any failure opens it again.
+    """
+
+    def __init__(self, agent_name: str):
+        self.agent_name = agent_name
+        self.state = CLOSED
+        self._window: deque[tuple[bool, bool]] = deque(maxlen=settings.GATEWAY_BREAKER_WINDOW)
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+    def _transition(self, state: str, reason: str = "") -> None:
+        logger.warning(f"Circuit for '{self.agent_name}' {self.state} -> {state}" + (f" ({reason})" if reason else ""))
+        self.state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.times_opened += 1
+        elif state == HALF_OPEN:
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        elif state == CLOSED:
+            self._window.clear()
+
+    def _retry_after(self) -> int:
+        remaining = settings.GATEWAY_BREAKER_OPEN_SECONDS - (time.monotonic() - self._opened_at)
+        return max(math.ceil(remaining), 1)
+
+    def before_call(self) -> bool:
+        """
+        Asks permission for one upstream call. Raises CircuitOpen when the call
+        must not be made; returns True if the call is a half-open probe.
+        """
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < settings.GATEWAY_BREAKER_OPEN_SECONDS:
+                self.rejected += 1
+                raise CircuitOpen(self.agent_name, self._retry_after())
+            self._transition(HALF_OPEN, "open period elapsed")
+        if self.state == HALF_OPEN:
+            if self._probes_in_flight >= settings.GATEWAY_BREAKER_HALF_OPEN_PROBES:
+                self.rejected += 1
+                raise CircuitOpen(self.agent_name, 1)
+            self._probes_in_flight += 1
+            return True
+        return False
+
+    def abandon(self, probe: bool) -> None:
+        """Returns a permit that was granted but never used for an upstream call."""
+        if probe and self.state == HALF_OPEN:
+            self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+
+    def record(self, probe: bool, failed: bool, duration: float) -> None:
+        """Records the outcome of a call made after before_call()."""
+        slow = duration >= settings.GATEWAY_BREAKER_SLOW_CALL_SECONDS
+        if self.state == HALF_OPEN:
+            if not probe:
+                return  # A call started before the circuit opened; its result is stale
+            self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+            if failed or slow:
+                self._transition(OPEN, "probe " + ("failed" if failed else "was slow"))
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= settings.GATEWAY_BREAKER_HALF_OPEN_PROBES:
+                self._transition(CLOSED, "probes succeeded")
+            return
+        if self.state == OPEN:
+            return
+
+        self._window.append((failed, slow))
+        if len(self._window) < settings.GATEWAY_BREAKER_MIN_CALLS:
+            return
+        failure_rate = sum(f for f, _ in self._window) / len(self._window)
+        slow_rate = sum(s for _, s in self._window) / len(self._window)
+        if failure_rate >= settings.GATEWAY_BREAKER_FAILURE_RATE:
+            self._transition(OPEN, f"failure rate {failure_rate:.0%}")
+        elif slow_rate >= settings.GATEWAY_BREAKER_SLOW_CALL_RATE:
+            self._transition(OPEN, f"slow call rate {slow_rate:.0%}")
+
+    def stats(self) -> dict:
+        calls = len(self._window)
+        return {
+            "state": self.state,
+            "window_calls": calls,
+            "failure_rate": round(sum(f for f, _ in self._window) / calls, 4) if calls else None,
+            "slow_call_rate": round(sum(s for _, s in self._window) / calls, 4) if calls else None,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "retry_after_s": self._retry_after() if self.state == OPEN else None,
+        }
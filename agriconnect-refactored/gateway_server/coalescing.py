@@ -0,0 +1,50 @@
+# agriconnect-refactored/gateway_server/coalescing.py
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls: the first caller for a key starts the
+    work, later callers with the same key wait for that same result instead of
+    starting their own. The work runs in its own task, so a leader that
+    disconnects does not cancel the call for everyone else.
+    """
+
+    def __init__(self):
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        """Returns (result, shared); `shared` is True for callers that joined an existing call."""
+        task = self._in_flight.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        return await asyncio.shield(task), shared
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the exception as retrieved even if every waiter has gone away
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Coalesced call for {key} failed: {task.exception()!r}")
+
+    def stats(self) -> dict:
+        return {
+            "in_flight_keys": len(self._in_flight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,62 @@
+# agriconnect-refactored/gateway_server/hedging.py
+
+import math
+from collections import deque
+
+from common.settings import settings
+
+# Recent latencies kept per agent to estimate the hedge delay
+LATENCY_SAMPLES = 256
+# Most hedges that may be banked up during quiet periods
+MAX_HEDGE_TOKENS = 10.0
+
+
+class HedgePolicy:
+    """
+    Decides when a slow call to an agent gets a duplicate sent to a second
+    replica. The delay is a percentile of recent latencies, and a token
+    budget caps hedges at GATEWAY_HEDGE_BUDGET extra requests per request.
+    """
+
+    def __init__(self, agent_name: str):
+        self.agent_name = agent_name
+        self._latencies: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self._tokens = 1.0
+        self.requests = 0
+        self.hedges_sent = 0
+        self.hedge_wins = 0
+        self.budget_denied = 0
+
+    def record_latency(self, seconds: float) -> None:
+        self._latencies.append(seconds)
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait for the first replica before hedging."""
+        if len(self._latencies) < settings.GATEWAY_HEDGE_MIN_SAMPLES:
+            return settings.GATEWAY_HEDGE_DEFAULT_DELAY
+        ordered = sorted(self._latencies)
+        index = min(math.ceil(settings.GATEWAY_HEDGE_PERCENTILE * len(ordered)) - 1, len(ordered) - 1)
+        return max(ordered[max(index, 0)], settings.GATEWAY_HEDGE_MIN_DELAY)
+
+    def on_request(self) -> None:
+        self.requests += 1
+        self._tokens = min(self._tokens + settings.GATEWAY_HEDGE_BUDGET, MAX_HEDGE_TOKENS)
+
+    def try_acquire_hedge(self) -> bool:
+        """Spends one hedge from the budget, or returns False if it is used up."""
+        if self._tokens < 1.0:
+            self.budget_denied += 1
+            return False
+        self._tokens -= 1.0
+        self.hedges_sent += 1
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "hedges_sent": self.hedges_sent,
+            "hedge_wins": self.hedge_wins,
+            "budget_denied": self.budget_denied,
+            "hedge_delay_s": round(self.hedge_delay(), 3),
+            "latency_samples": len(self._latencies),
+        }
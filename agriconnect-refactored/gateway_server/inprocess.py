@@ -0,0 +1,135 @@
+# agriconnect-refactored/gateway_server/inprocess.py
+
+import asyncio
+import importlib
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Callable
+
+from fastapi import Response
+from common.settings import settings
+
+logger = logging.getLogger(__name__)
+
+AGENT_CARDS_DIR = Path(__file__).parent.parent / "agent_cards"
+
+# Agent name -> (agent card file, executor module, executor class)
+INPROCESS_AGENTS = {
+    "smart_price_prediction_agent_v2": (
+        "price_prediction_agent.json", "agents.price_prediction_agent.executor", "PricePredictionAgentExecutor",
+    ),
+    "smart_buyer_matching_agent": (
+        "buyer_matching_agent.json", "agents.buyer_matching_agent.executor", "BuyerMatchingAgentExecutor",
+    ),
+    "trade_coordination_agent": (
+        "trade_coordination_agent.json", "agents.trade_coordination_agent.executor", "TradeCoordinationAgentExecutor",
+    ),
+}
+
+
+def inprocess_url(agent_name: str) -> str:
+    """Replica URL under which an in-process agent is registered with the gateway."""
+    return f"http://{agent_name}.inprocess/"
+
+
+def build_agent_apps() -> dict:
+    """
+    Builds the A2AStarletteApplication of every agent, exactly as the agent's
+    own __main__ does, so the gateway can host them in its own process.
+    The agent cards point callers at the gateway's /invoke/ URL.
+    """
+    # Imported here so the gateway does not pull in the A2A server and ADK
+    # unless in-process hosting is switched on.
+    from a2a.server.apps import A2AStarletteApplication
+    from a2a.server.request_handlers import DefaultRequestHandler
+    from a2a.server.tasks import InMemoryTaskStore
+    from a2a.types import AgentCard
+
+    base_gateway_url = settings.PUBLIC_GATEWAY_URL if settings.PUBLIC_GATEWAY_URL else settings.GATEWAY_SERVER_URL
+    apps = {}
+    for agent_name, (card_file, module_name, executor_name) in INPROCESS_AGENTS.items():
+        card_path = AGENT_CARDS_DIR / card_file
+        if not card_path.exists():
+            raise FileNotFoundError(f"Agent card not found at {card_path}")
+        with card_path.open('r', encoding='utf-8') as f:
+            agent_card_data = json.load(f)
+        agent_card_data["url"] = f"{base_gateway_url}/invoke/?agent_name={agent_name}"
+
+        executor_class = getattr(importlib.import_module(module_name), executor_name)
+        request_handler = DefaultRequestHandler(
+            agent_executor=executor_class(),
+            task_store=InMemoryTaskStore(),
+        )
+        apps[agent_name] = A2AStarletteApplication(
+            agent_card=AgentCard(**agent_card_data),
+            http_handler=request_handler,
+        ).build()
+        logger.info(f"Hosting agent '{agent_name}' in-process in the gateway.")
+    return apps
+
+
+class InProcessAgentResponse(Response):
+    """
+    Hands the gateway's request straight to a mounted agent app: the agent
+    reads the body from, and streams its reply (including SSE updates) to,
+    the caller's own connection, with no loopback HTTP hop or re-encoding.
+    Like httpx's read timeout, `timeout` bounds the wait for the reply to
+    start and each gap between its chunks; an agent that stalls before
+    replying gets a 504, one that stalls mid-reply has its stream cut off.
+    """
+
+    def __init__(self, agent_app, body: bytes | None = None, timeout: float | None = None):
+        self.agent_app = agent_app
+        self.replay_body = body
+        self.timeout = timeout
+        self.background = None
+        self.status_code = 500
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.started = time.perf_counter()
+        self.headers_at: float | None = None
+        self.finish_callbacks: list[Callable[["InProcessAgentResponse"], None]] = []
+
+    async def __call__(self, scope, receive, send) -> None:
+        body_replayed = False
+
+        async def agent_receive():
+            nonlocal body_replayed
+            # The gateway may already have read the body (e.g. to check the cache)
+            if self.replay_body is not None and not body_replayed:
+                body_replayed = True
+                self.request_bytes = len(self.replay_body)
+                return {"type": "http.request", "body": self.replay_body, "more_body": False}
+            message = await receive()
+            if message["type"] == "http.request":
+                self.request_bytes += len(message.get("body", b""))
+            return message
+
+        async def agent_send(message):
+            if message["type"] == "http.response.start":
+                self.status_code = message["status"]
+                self.headers_at = time.perf_counter()
+            elif message["type"] == "http.response.body":
+                self.response_bytes += len(message.get("body", b""))
+            await send(message)
+            if self.timeout is not None:
+                deadline.reschedule(asyncio.get_running_loop().time() + self.timeout)
+
+        # The A2A app serves JSON-RPC at its root
+        agent_scope = {**scope, "path": "/", "raw_path": b"/", "root_path": ""}
+        try:
+            async with asyncio.timeout(self.timeout) as deadline:
+                await self.agent_app(agent_scope, agent_receive, agent_send)
+        except TimeoutError:
+            if not deadline.expired():
+                raise
+            logger.error(f"In-process agent sent nothing for {self.timeout}s; ending its response.")
+            if self.headers_at is None:
+                self.status_code = 504
+                await send({"type": "http.response.start", "status": 504, "headers": [(b"content-type", b"text/plain; charset=utf-8")]})
+                await send({"type": "http.response.body", "body": b"Gateway timeout: the agent did not reply in time."})
+        finally:
+            for callback in self.finish_callbacks:
+                callback(self)
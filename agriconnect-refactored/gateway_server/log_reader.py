@@ -0,0 +1,152 @@
+# agriconnect-refactored/gateway_server/log_reader.py
+
+import asyncio
+import os
+import re
+import time
+import zlib
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable
+
+# Size of each block read from the log file. The file is never loaded whole.
+CHUNK_SIZE = 64 * 1024
+# Seconds between SSE keep-alive comments while a followed log is idle
+KEEPALIVE_INTERVAL = 15.0
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    """Raised when a Range header does not overlap the log file."""
+
+
+def parse_range_header(range_header: str, file_size: int) -> tuple[int, int] | None:
+    """
+    Parses a single 'bytes=' Range header into an inclusive (start, end) pair.
+    Returns None for headers we do not understand (the full file is served),
+    and raises RangeNotSatisfiable when the range lies outside the file.
+    """
+    match = _RANGE_RE.match(range_header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    start_str, end_str = match.groups()
+    if start_str == "":
+        # Suffix range: the last N bytes
+        suffix = int(end_str)
+        if suffix == 0 or file_size == 0:
+            raise RangeNotSatisfiable()
+        return max(file_size - suffix, 0), file_size - 1
+    start = int(start_str)
+    end = int(end_str) if end_str else file_size - 1
+    if start >= file_size or end < start:
+        raise RangeNotSatisfiable()
+    return start, min(end, file_size - 1)
+
+
+def _find_tail_offset(path: Path, lines: int) -> int:
+    """Scans backwards from the end of the file to where the last `lines` lines start."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        # A trailing newline terminates the last line rather than starting a new one
+        if position > 0:
+            f.seek(position - 1)
+            if f.read(1) == b"\n":
+                position -= 1
+        newlines_seen = 0
+        while position > 0:
+            read_size = min(CHUNK_SIZE, position)
+            position -= read_size
+            f.seek(position)
+            block = f.read(read_size)
+            index = len(block)
+            while True:
+                index = block.rfind(b"\n", 0, index)
+                if index == -1:
+                    break
+                newlines_seen += 1
+                if newlines_seen == lines:
+                    return position + index + 1
+        return 0
+
+
+async def find_tail_offset(path: Path, lines: int) -> int:
+    """Non-blocking wrapper around the backwards scan for `tail=N`."""
+    return await asyncio.to_thread(_find_tail_offset, path, lines)
+
+
+def _read_block(path: Path, offset: int, size: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(size)
+
+
+async def iter_file_range(path: Path, start: int, end: int) -> AsyncIterator[bytes]:
+    """
+    Yields bytes start..end (inclusive) of the file in CHUNK_SIZE blocks.
+    Each read runs in a worker thread so the event loop never blocks on disk.
+    """
+    offset = start
+    while offset <= end:
+        block = await asyncio.to_thread(_read_block, path, offset, min(CHUNK_SIZE, end - offset + 1))
+        if not block:
+            break
+        offset += len(block)
+        yield block
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Compresses a byte stream incrementally into a single gzip member."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """True if the Accept-Encoding header allows gzip (and does not set q=0)."""
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+async def follow_log(
+    path: Path,
+    offset: int,
+    is_disconnected: Callable[[], Awaitable[bool]],
+    poll_interval: float,
+) -> AsyncIterator[str]:
+    """
+    Pushes lines appended to the log after `offset` as SSE events until the
+    client disconnects. A file that shrinks (truncated or rotated) is re-read
+    from the start.
+    """
+    pending = b""
+    last_sent = time.monotonic()
+    while not await is_disconnected():
+        try:
+            size = (await asyncio.to_thread(path.stat)).st_size
+        except FileNotFoundError:
+            size = 0
+        if size < offset:
+            offset, pending = 0, b""
+        if size > offset:
+            block = await asyncio.to_thread(_read_block, path, offset, min(CHUNK_SIZE, size - offset))
+            offset += len(block)
+            pending += block
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                text = line.rstrip(b"\r").decode("utf-8", errors="replace")
+                yield f"data: {text}\n\n"
+                last_sent = time.monotonic()
+            if size > offset:
+                continue  # More data already waiting, keep reading without sleeping
+        elif time.monotonic() - last_sent >= KEEPALIVE_INTERVAL:
+            # Comment line keeps idle connections open through proxies
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+        await asyncio.sleep(poll_interval)
@@ -0,0 +1,145 @@
+# agriconnect-refactored/gateway_server/metrics.py
+
+"""
+Minimal Prometheus text-format metrics for the gateway.
+
+The gateway runs on a single asyncio event loop, so metric updates are plain
+dict/list operations with no locks: recording a sample is a dict lookup, a
+bisect and an increment, which keeps the proxy hot path cheap.
+"""
+
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+# Upstream latency buckets in seconds; LLM-backed agents range from ms to minutes
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+# Body size buckets in bytes
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name, self.documentation, self.labelnames = name, documentation, labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Gauge:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name, self.documentation, self.labelnames = name, documentation, labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def set(self, *labels: str, value: float) -> None:
+        self._values[labels] = value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} gauge"
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...], buckets: tuple[float, ...]):
+        self.name, self.documentation, self.labelnames = name, documentation, labelnames
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (non-cumulative, last = +Inf), sum, count]
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, *labels: str, value: float) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}"
+
+
+class GatewayMetrics:
+    """All metrics exported on the gateway's /metrics endpoint."""
+
+    def __init__(self):
+        self.requests = Counter(
+            "agriconnect_gateway_requests_total", "Requests handled by /invoke/.", ("agent", "status")
+        )
+        self.in_flight = Gauge(
+            "agriconnect_gateway_in_flight_requests", "Requests currently being handled by /invoke/.", ("agent",)
+        )
+        self.upstream_latency = Histogram(
+            "agriconnect_gateway_upstream_latency_seconds",
+            "Time from sending a request to an agent until its response headers arrive.",
+            ("agent",),
+            LATENCY_BUCKETS,
+        )
+        self.admission_wait = Histogram(
+            "agriconnect_gateway_admission_wait_seconds",
+            "Time a request waited in the agent's admission queue.",
+            ("agent",),
+            LATENCY_BUCKETS,
+        )
+        self.request_size = Histogram(
+            "agriconnect_gateway_request_size_bytes", "Size of /invoke/ request bodies.", ("agent",), SIZE_BUCKETS
+        )
+        self.response_size = Histogram(
+            "agriconnect_gateway_response_size_bytes", "Size of /invoke/ response bodies.", ("agent",), SIZE_BUCKETS
+        )
+        # Point-in-time gauges filled from other components just before each scrape
+        self.snapshot_gauges: list[tuple[Gauge, Callable[[Gauge], None]]] = []
+
+    def add_snapshot_gauge(self, name: str, documentation: str, labelnames: tuple[str, ...], fill: Callable[[Gauge], None]) -> None:
+        self.snapshot_gauges.append((Gauge(name, documentation, labelnames), fill))
+
+    def render(self) -> str:
+        lines = []
+        for metric in (
+            self.requests, self.in_flight, self.upstream_latency, self.admission_wait,
+            self.request_size, self.response_size,
+        ):
+            lines.extend(metric.render())
+        for gauge, fill in self.snapshot_gauges:
+            fill(gauge)
+            lines.extend(gauge.render())
+        return "\n".join(lines) + "\n"
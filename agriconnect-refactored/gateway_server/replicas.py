@@ -0,0 +1,278 @@
+# agriconnect-refactored/gateway_server/replicas.py
+
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+import httpx
+from common.settings import settings
+
+from .a2a_payload import response_affinity_keys
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest sample in the per-replica latency moving average
+LATENCY_EWMA_ALPHA = 0.2
+# Bytes of a streamed reply scanned for its task id before giving up
+AFFINITY_SNIFF_BYTES = 64 * 1024
+
+
+def load_agent_backends() -> dict[str, list[str]]:
+    """
+    Builds the agent name -> replica URLs map. Each agent starts with its URL
+    from settings plus any extra *_REPLICAS; an optional JSON registry file
+    (GATEWAY_AGENT_REGISTRY_FILE) replaces the list for the agents it names.
+    """
+    backends = {
+        "smart_price_prediction_agent_v2": [settings.PRICE_PREDICTION_AGENT_URL, *settings.PRICE_PREDICTION_AGENT_REPLICAS],
+        "smart_buyer_matching_agent": [settings.BUYER_MATCHING_AGENT_URL, *settings.BUYER_MATCHING_AGENT_REPLICAS],
+        "trade_coordination_agent": [settings.TRADE_COORDINATION_AGENT_URL, *settings.TRADE_COORDINATION_AGENT_REPLICAS],
+    }
+
+    if settings.GATEWAY_AGENT_REGISTRY_FILE:
+        registry_path = Path(settings.GATEWAY_AGENT_REGISTRY_FILE)
+        if registry_path.is_file():
+            with registry_path.open("r", encoding="utf-8") as f:
+                registry = json.load(f)
+            for agent_name, urls in registry.items():
+                if isinstance(urls, str):
+                    urls = [urls]
+                backends[agent_name] = list(urls)
+            logger.info(f"Loaded agent replica registry from {registry_path.resolve()}")
+        else:
+            logger.warning(f"Agent registry file not found at: {registry_path.resolve()}")
+
+    # Drop duplicates while keeping the configured order
+    return {name: list(dict.fromkeys(urls)) for name, urls in backends.items() if urls}
+
+
+@dataclass
+class Replica:
+    """Live state of a single backend replica."""
+    url: str
+    in_flight: int = 0
+    requests: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    ejected_until: float = 0.0
+    latency_ewma_ms: float | None = None
+    last_latency_ms: float | None = None
+
+    @property
+    def ejected(self) -> bool:
+        return time.monotonic() < self.ejected_until
+
+    def as_dict(self) -> dict:
+        return {
+            "url": self.url,
+            "healthy": not self.ejected,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejected_for_s": round(max(self.ejected_until - time.monotonic(), 0.0), 1),
+            "latency_ewma_ms": round(self.latency_ewma_ms, 1) if self.latency_ewma_ms is not None else None,
+            "last_latency_ms": round(self.last_latency_ms, 1) if self.last_latency_ms is not None else None,
+        }
+
+
+class ReplicaSet:
+    """
+    The replicas of one agent, balanced by least outstanding requests. Each
+    replica keeps its own tasks and conversation sessions in memory, so
+    requests about a known task or context stick to the replica that has it.
+    """
+
+    def __init__(self, agent_name: str, urls: list[str]):
+        self.agent_name = agent_name
+        self.replicas = [Replica(url=url) for url in urls]
+        # 'task:<id>' / 'context:<id>' -> replica holding it, least recently used first
+        self._affinity: OrderedDict[str, Replica] = OrderedDict()
+
+    def pinned(self, keys) -> Replica | None:
+        """The replica that holds the first known task or context among `keys`."""
+        for key in keys:
+            replica = self._affinity.get(key)
+            if replica is not None:
+                self._affinity.move_to_end(key)
+                return replica
+        return None
+
+    def pin(self, keys, replica: Replica) -> None:
+        """Records that the tasks/contexts in `keys` live on `replica`."""
+        for key in keys:
+            self._affinity[key] = replica
+            self._affinity.move_to_end(key)
+        while len(self._affinity) > settings.GATEWAY_AFFINITY_MAX_ENTRIES:
+            self._affinity.popitem(last=False)
+
+    def pick(self, exclude: tuple[Replica, ...] = (), affinity=()) -> Replica | None:
+        """
+        Returns the replica holding a task or context named in `affinity`, even
+        if it is ejected (no other replica knows it). Otherwise returns the
+        healthy replica with the fewest in-flight requests (ties go to the lower
+        average latency, then random). If every replica is ejected we still
+        pick one rather than fail the call outright.
+        """
+        pinned = self.pinned(affinity)
+        if pinned is not None and pinned not in exclude:
+            return pinned
+        candidates = [r for r in self.replicas if r not in exclude]
+        healthy = [r for r in candidates if not r.ejected]
+        if not healthy and candidates:
+            logger.warning(f"All replicas of '{self.agent_name}' are ejected; ignoring ejection.")
+        pool = healthy or candidates
+        if not pool:
+            return None
+        return min(pool, key=lambda r: (r.in_flight, r.latency_ewma_ms or 0.0, random.random()))
+
+    def begin(self, replica: Replica) -> None:
+        """Marks a request as outstanding on the replica."""
+        replica.in_flight += 1
+        replica.requests += 1
+
+    def observe_latency(self, replica: Replica, started: float) -> None:
+        """Records time-to-response-headers for a successful upstream call."""
+        latency_ms = (time.perf_counter() - started) * 1000
+        replica.last_latency_ms = latency_ms
+        if replica.latency_ewma_ms is None:
+            replica.latency_ewma_ms = latency_ms
+        else:
+            replica.latency_ewma_ms += LATENCY_EWMA_ALPHA * (latency_ms - replica.latency_ewma_ms)
+        replica.consecutive_failures = 0
+
+    def release(self, replica: Replica) -> None:
+        """Marks the request as finished (called once the response body is done)."""
+        replica.in_flight = max(replica.in_flight - 1, 0)
+
+    def record_failure(self, replica: Replica, reason: str) -> None:
+        """Counts a failure and ejects the replica after too many in a row."""
+        replica.failures += 1
+        replica.consecutive_failures += 1
+        if replica.consecutive_failures >= settings.GATEWAY_REPLICA_EJECT_AFTER_FAILURES and not replica.ejected:
+            replica.ejected_until = time.monotonic() + settings.GATEWAY_REPLICA_EJECTION_SECONDS
+            logger.warning(
+                f"Ejecting replica {replica.url} of '{self.agent_name}' for "
+                f"{settings.GATEWAY_REPLICA_EJECTION_SECONDS}s after "
+                f"{replica.consecutive_failures} consecutive failures ({reason})."
+            )
+
+    def record_health_success(self, replica: Replica) -> None:
+        replica.consecutive_failures = 0
+
+
+class TaskAffinity:
+    """
+    Task affinity for one request: the task/context keys it refers to, and
+    learning which replica holds the task and context its reply names. A
+    streamed reply is scanned as it is relayed; SSE events are parsed one
+    `data:` line at a time until the first one that names a task.
+    """
+
+    def __init__(self, keys: list[str]):
+        self.keys = keys
+        self._replica_set: ReplicaSet | None = None
+        self._replica: Replica | None = None
+        self._buffer = b""
+        self._scanned = 0
+        self._learned = False
+
+    def bind(self, replica_set: ReplicaSet, replica: Replica) -> None:
+        """Pins the request's own keys to the replica it was sent to."""
+        self._replica_set, self._replica = replica_set, replica
+        replica_set.pin(self.keys, replica)
+
+    def learn(self, body: bytes) -> None:
+        """Pins the task and context named in a complete JSON-RPC reply (or one SSE event)."""
+        if self._replica is None or self._learned:
+            return
+        try:
+            keys = response_affinity_keys(json.loads(body))
+        except (ValueError, UnicodeDecodeError):
+            return
+        if keys:
+            self._replica_set.pin(keys, self._replica)
+            self._learned = True
+
+    def feed(self, chunk: bytes) -> None:
+        """Scans the next chunk of a streamed reply."""
+        if self._replica is None or self._learned or len(self._buffer) > AFFINITY_SNIFF_BYTES:
+            return
+        self._buffer += chunk
+        # The whole reply is kept (within the limit) for flush(); only new complete lines are parsed
+        end = self._buffer.rfind(b"\n")
+        if end < self._scanned:
+            return
+        for line in self._buffer[self._scanned:end].split(b"\n"):
+            if line.startswith(b"data:"):
+                self.learn(line[5:])
+                if self._learned:
+                    self._buffer = b""
+                    return
+        self._scanned = end + 1
+
+    def flush(self) -> None:
+        """Called when a streamed reply ends: a plain JSON reply is parsed as a whole."""
+        if self._buffer and not self._learned and len(self._buffer) <= AFFINITY_SNIFF_BYTES:
+            self.learn(self._buffer)
+        self._buffer = b""
+
+
+class ReplicaRegistry:
+    """
+    Holds a ReplicaSet per agent name and runs active health checks against
+    every replica's A2A agent card endpoint in the background.
+    """
+
+    def __init__(self, backends: dict[str, list[str]]):
+        self._sets = {name: ReplicaSet(name, urls) for name, urls in backends.items()}
+        self._health_task: asyncio.Task | None = None
+
+    def get(self, agent_name: str) -> ReplicaSet | None:
+        return self._sets.get(agent_name)
+
+    def all_urls(self) -> list[str]:
+        return [r.url for replica_set in self._sets.values() for r in replica_set.replicas]
+
+    async def start(self, client_for: Callable[[str], httpx.AsyncClient]) -> None:
+        if settings.GATEWAY_HEALTH_CHECK_INTERVAL > 0:
+            self._health_task = asyncio.create_task(self._health_check_loop(client_for))
+
+    async def aclose(self) -> None:
+        if self._health_task:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+
+    async def _check_replica(self, replica_set: ReplicaSet, replica: Replica, client: httpx.AsyncClient) -> None:
+        health_url = f"{replica.url.rstrip('/')}{settings.GATEWAY_HEALTH_CHECK_PATH}"
+        try:
+            response = await client.get(health_url, timeout=settings.GATEWAY_HEALTH_CHECK_TIMEOUT)
+            if response.status_code < 500:
+                replica_set.record_health_success(replica)
+                return
+            reason = f"health check returned {response.status_code}"
+        except Exception as e:
+            reason = f"health check failed: {type(e).__name__}"
+        replica_set.record_failure(replica, reason)
+
+    async def _health_check_loop(self, client_for: Callable[[str], httpx.AsyncClient]) -> None:
+        while True:
+            checks = [
+                self._check_replica(replica_set, replica, client_for(replica.url))
+                for replica_set in self._sets.values()
+                for replica in replica_set.replicas
+            ]
+            await asyncio.gather(*checks, return_exceptions=True)
+            await asyncio.sleep(settings.GATEWAY_HEALTH_CHECK_INTERVAL)
+
+    def stats(self) -> dict:
+        return {name: [r.as_dict() for r in replica_set.replicas] for name, replica_set in self._sets.items()}
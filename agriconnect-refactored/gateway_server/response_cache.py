@@ -0,0 +1,101 @@
+# agriconnect-refactored/gateway_server/response_cache.py
+
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    body: bytes
+    content_type: str
+    stored_at: float
+    expires_at: float
+
+    @property
+    def size(self) -> int:
+        return len(self.body)
+
+
+class ResponseCache:
+    """
+    Opt-in TTL cache of agent replies for idempotent queries, bounded by a
+    total byte budget and evicted least-recently-used first. Only agents with
+    a TTL configured are cached.
+    """
+
+    def __init__(self, ttls: dict[str, float], max_bytes: int):
+        self._ttls = {name: ttl for name, ttl in ttls.items() if ttl > 0}
+        self._max_bytes = max_bytes
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._agent_of_key: dict[str, str] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def ttl_for(self, agent_name: str) -> float | None:
+        return self._ttls.get(agent_name)
+
+    @staticmethod
+    def key_for(agent_name: str, region: str, normalized_text: str) -> str:
+        digest = hashlib.sha256(f"{agent_name}\x00{region}\x00{normalized_text}".encode("utf-8")).hexdigest()
+        return f"{agent_name}:{digest}"
+
+    def get(self, key: str) -> CacheEntry | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, agent_name: str, body: bytes, content_type: str) -> None:
+        ttl = self.ttl_for(agent_name)
+        if not ttl or len(body) > self._max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        now = time.monotonic()
+        self._entries[key] = CacheEntry(body=body, content_type=content_type, stored_at=now, expires_at=now + ttl)
+        self._agent_of_key[key] = agent_name
+        self._bytes += len(body)
+        while self._bytes > self._max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def purge(self, agent_name: str | None = None) -> int:
+        """Drops every entry, or only those of one agent. Returns how many were removed."""
+        keys = [k for k, name in self._agent_of_key.items() if agent_name is None or name == agent_name]
+        for key in keys:
+            self._remove(key)
+        logger.info(f"Purged {len(keys)} cached responses" + (f" for '{agent_name}'." if agent_name else "."))
+        return len(keys)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._agent_of_key.pop(key, None)
+        self._bytes -= entry.size
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "agents": self._ttls,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self._max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
@@ -1,90 +1,655 @@
 # agriconnect-refactored/gateway_server/server.py
 
+import asyncio
 import httpx
-from fastapi import FastAPI, Request, Response
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from common.settings import settings # Import settings object
+from common.text import normalize_text
 import logging
+import time
 from pathlib import Path # Import Path
+from typing import Callable
 
-# This is our main public-facing application
-app = FastAPI(title="AgriConnect Gateway")
+from .a2a_payload import (
+    affinity_keys,
+    carries_task_reference,
+    extract_region,
+    extract_user_text,
+    is_completed_task_response,
+    parse_jsonrpc_request,
+    parse_send_message_request,
+    rewrite_response_ids,
+)
+from .admission import AdmissionController, AdmissionRejected, AgentAdmission
+from .circuit_breaker import CircuitBreaker, CircuitOpen
+from .coalescing import SingleFlight
+from .hedging import HedgePolicy
+from .inprocess import InProcessAgentResponse, build_agent_apps, inprocess_url
+from .log_reader import (
+    RangeNotSatisfiable,
+    accepts_gzip,
+    find_tail_offset,
+    follow_log,
+    gzip_stream,
+    iter_file_range,
+    parse_range_header,
+)
+from .metrics import GatewayMetrics
+from .replicas import Replica, ReplicaRegistry, ReplicaSet, TaskAffinity, load_agent_backends
+from .response_cache import ResponseCache
+from .upstream import UpstreamPool, passthrough_headers, relay_upstream_body
 
 # The root logger is already configured by common.settings.py
 logger = logging.getLogger(__name__)
 
-# The map of agent names to their INTERNAL URLs
-AGENT_URL_MAP = {
-    "smart_price_prediction_agent_v2": settings.PRICE_PREDICTION_AGENT_URL,
-    "smart_buyer_matching_agent": settings.BUYER_MATCHING_AGENT_URL,
-    "trade_coordination_agent": settings.TRADE_COORDINATION_AGENT_URL,
+# The map of agent names to the INTERNAL URLs of their replicas
+AGENT_URL_MAP = load_agent_backends()
+
+# Single-container mode: the agents' A2A apps run inside the gateway process and
+# replace the separate agent servers, so no call takes a loopback HTTP hop.
+inprocess_apps = build_agent_apps() if settings.GATEWAY_INPROCESS_AGENTS else {}
+for _agent_name in inprocess_apps:
+    AGENT_URL_MAP[_agent_name] = [inprocess_url(_agent_name)]
+
+# Per-agent replica state (in-flight counts, latency, health) for load balancing
+replica_registry = ReplicaRegistry(AGENT_URL_MAP)
+
+# Per-agent concurrency limits and bounded wait queues
+admission_controller = AdmissionController(AGENT_URL_MAP)
+
+# Per-agent circuit breakers so a sick agent fails fast instead of tying up sockets
+circuit_breakers = {agent_name: CircuitBreaker(agent_name) for agent_name in AGENT_URL_MAP}
+
+# Optional hedging of slow idempotent calls to a second replica
+hedge_policies = {
+    agent_name: HedgePolicy(agent_name)
+    for agent_name in settings.GATEWAY_HEDGE_AGENTS if agent_name in AGENT_URL_MAP
 }
 
-# --- CHANGE: Access LOG_FILE_PATH from the settings instance ---
+# Prometheus metrics for /metrics, plus gauges read from the components above at scrape time
+gateway_metrics = GatewayMetrics()
+BREAKER_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def _fill_admission_gauges(gauge) -> None:
+    for agent_name, admission in admission_controller.stats().items():
+        gauge.set(agent_name, "queued", value=admission["queue_depth"])
+        gauge.set(agent_name, "active", value=admission["active"])
+
+
+def _fill_breaker_gauges(gauge) -> None:
+    for agent_name, breaker in circuit_breakers.items():
+        gauge.set(agent_name, value=BREAKER_STATE_VALUES[breaker.state])
+
+
+def _fill_replica_gauges(gauge) -> None:
+    for agent_name, replicas in replica_registry.stats().items():
+        for replica in replicas:
+            gauge.set(agent_name, replica["url"], value=replica["in_flight"])
+
+
+gateway_metrics.add_snapshot_gauge(
+    "agriconnect_gateway_admission_slots", "Admission slots in use ('active') and callers waiting ('queued').",
+    ("agent", "kind"), _fill_admission_gauges,
+)
+gateway_metrics.add_snapshot_gauge(
+    "agriconnect_gateway_circuit_state", "Circuit breaker state (0=closed, 1=half-open, 2=open).",
+    ("agent",), _fill_breaker_gauges,
+)
+gateway_metrics.add_snapshot_gauge(
+    "agriconnect_gateway_replica_in_flight_requests", "Outstanding upstream requests per replica.",
+    ("agent", "replica"), _fill_replica_gauges,
+)
+
+# Opt-in TTL/LRU cache of replies to idempotent agent queries
+response_cache = ResponseCache(settings.GATEWAY_CACHE_TTLS, settings.GATEWAY_CACHE_MAX_BYTES)
+
+# Single-flight coalescing of identical concurrent agent queries
+single_flight = SingleFlight()
+
+# Long-lived keep-alive connection pools, one per internal agent backend
+upstream_pool = UpstreamPool(
+    replica_registry.all_urls(),
+    asgi_apps={inprocess_url(agent_name): agent_app for agent_name, agent_app in inprocess_apps.items()},
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Opens the upstream pools and health checks on startup, closes them on shutdown."""
+    await upstream_pool.start()
+    await replica_registry.start(upstream_pool.client_for)
+    try:
+        yield
+    finally:
+        await replica_registry.aclose()
+        await upstream_pool.aclose()
+
+
+# This is our main public-facing application
+app = FastAPI(title="AgriConnect Gateway", lifespan=lifespan)
+
+for _agent_name, _agent_app in inprocess_apps.items():
+    # Also reachable directly, e.g. for the agent card at /agents/<name>/.well-known/agent.json
+    app.mount(f"/agents/{_agent_name}", _agent_app)
+
 @app.get("/logs")
-async def get_logs(request: Request):
+async def get_logs(
+    request: Request,
+    tail: int | None = Query(None, ge=1, description="Return only the last N lines."),
+    follow: bool = Query(False, description="Keep streaming newly appended lines over SSE."),
+):
     """
-    Serves the application log file.
+    Serves the application log file without ever loading it into memory.
+
+    Supports `Range: bytes=...` (206 Partial Content), `tail=N`, `follow=true`
+    (SSE stream of new lines, starting after the `tail` lines if given) and
+    gzip when the client's Accept-Encoding allows it. All file I/O runs in
+    worker threads so large logs do not block the event loop.
     """
     # Access LOG_FILE_PATH from the already initialized settings object
-    log_file_path_str = settings.LOG_FILE_PATH 
-    log_file_path = Path(log_file_path_str) # Use the path from settings
+    log_file_path = Path(settings.LOG_FILE_PATH)
 
-    if not log_file_path.is_file():
+    if not await asyncio.to_thread(log_file_path.is_file):
         logger.warning(f"Log file not found at: {log_file_path.resolve()}")
         return Response(content="Log file not found.", status_code=404)
 
     try:
-        with open(log_file_path, "r", encoding="utf-8") as f:
-            log_content = f.read()
-        
-        # Return the log file content
-        return Response(
-            content=log_content,
-            status_code=200,
-            media_type="text/plain", # Serve as plain text
-            headers={"X-Log-File-Name": log_file_path.name} # Optional header with filename
+        file_size = (await asyncio.to_thread(log_file_path.stat)).st_size
+        headers = {"X-Log-File-Name": log_file_path.name, "Accept-Ranges": "bytes"}
+
+        if follow:
+            start = await find_tail_offset(log_file_path, tail) if tail else file_size
+            headers.update({"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+            return StreamingResponse(
+                follow_log(log_file_path, start, request.is_disconnected, settings.LOG_FOLLOW_POLL_INTERVAL),
+                media_type="text/event-stream",
+                headers=headers,
+            )
+
+        status_code = 200
+        start, end = 0, file_size - 1
+        range_header = request.headers.get("range")
+        if range_header:
+            try:
+                byte_range = parse_range_header(range_header, file_size)
+            except RangeNotSatisfiable:
+                return Response(status_code=416, headers={"Content-Range": f"bytes */{file_size}"})
+            if byte_range:
+                start, end = byte_range
+                status_code = 206
+                headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+        elif tail:
+            start = await find_tail_offset(log_file_path, tail)
+
+        body = iter_file_range(log_file_path, start, end)
+        # Ranges refer to the uncompressed bytes, so only whole/tail responses are gzipped
+        if status_code == 200 and accepts_gzip(request.headers.get("accept-encoding", "")):
+            body = gzip_stream(body)
+            headers.update({"Content-Encoding": "gzip", "Vary": "Accept-Encoding"})
+        else:
+            headers["Content-Length"] = str(end - start + 1)
+
+        return StreamingResponse(
+            body,
+            status_code=status_code,
+            media_type="text/plain; charset=utf-8", # Serve as plain text
+            headers=headers,
         )
     except Exception as e:
         logger.error(f"Error reading log file {log_file_path.resolve()}: ", exc_info=True)
         return Response(content="Error reading log file.", status_code=500)
-# --- END CHANGE ---
+
+
+async def send_to_replica(
+    replica_set: ReplicaSet,
+    replica: Replica,
+    url: str,
+    *,
+    content,
+    headers: dict,
+) -> httpx.Response:
+    """
+    Sends the call to one replica through its connection pool and returns as
+    soon as the response headers arrive, recording the replica's latency and
+    failures. The caller owns the in-flight slot taken with `replica_set.begin`.
+    """
+    started = time.perf_counter()
+    try:
+        response = await upstream_pool.send("POST", url, content=content, headers=headers, stream=True)
+    except httpx.TransportError as e:
+        replica_set.record_failure(replica, type(e).__name__)
+        raise
+
+    if response.status_code >= 500:
+        replica_set.record_failure(replica, f"upstream returned {response.status_code}")
+    else:
+        replica_set.observe_latency(replica, started)
+    return response
+
+
+async def guard_agent_call(agent_name: str) -> tuple[CircuitBreaker, bool, AgentAdmission, float]:
+    """
+    Checks the agent's circuit breaker and waits for an admission slot.
+    Returns the breaker, whether this call is its half-open probe, the
+    admission and the admission time; the caller must record the outcome
+    with the breaker and release the slot. Raises CircuitOpen or
+    AdmissionRejected, handing the probe back if the wait does not succeed.
+    """
+    breaker = circuit_breakers[agent_name]
+    probe = breaker.before_call()
+    admission = admission_controller.get(agent_name)
+    queued_at = time.perf_counter()
+    try:
+        admitted_at = await admission.acquire()
+    except BaseException:
+        breaker.abandon(probe)
+        raise
+    gateway_metrics.admission_wait.observe(agent_name, value=admitted_at - queued_at)
+    return breaker, probe, admission, admitted_at
+
+
+async def open_upstream(
+    agent_name: str,
+    replica_set: ReplicaSet,
+    query: str,
+    *,
+    content,
+    headers: dict,
+    stream: bool,
+    replica: Replica | None = None,
+    affinity: TaskAffinity | None = None,
+) -> tuple[httpx.Response, Callable[[], None]]:
+    """
+    Makes one guarded upstream call: checks the agent's circuit breaker, takes
+    an admission slot, picks the replica holding the request's task (or the
+    least busy one, unless a replica is given) and sends the request. Returns
+    the response and a `finish` callback; for streamed responses the caller
+    must invoke `finish` once the body has been relayed, and feed the body to
+    `affinity` so follow-ups about the new task reach the same replica.
+    """
+    breaker, probe, admission, admitted_at = await guard_agent_call(agent_name)
+
+    if replica is None:
+        replica = replica_set.pick(affinity=affinity.keys if affinity else ())
+    if affinity:
+        affinity.bind(replica_set, replica)
+    # Construct the full target URL by appending path and query from the original request
+    # The original request's path is usually empty for /invoke, but query params are important.
+    full_target_url = f"{replica.url}?{query}"
+    logger.info(f"Gateway proxying request for agent '{agent_name}' to internal URL: {full_target_url}")
+
+    replica_set.begin(replica)
+
+    def finish():
+        replica_set.release(replica)
+        admission.release(admitted_at)
+
+    started = time.perf_counter()
+    try:
+        response = await send_to_replica(replica_set, replica, full_target_url, content=content, headers=headers)
+    except asyncio.CancelledError:
+        breaker.abandon(probe)
+        finish()
+        raise
+    except BaseException:
+        breaker.record(probe, failed=True, duration=time.perf_counter() - started)
+        finish()
+        raise
+    latency = time.perf_counter() - started
+    breaker.record(probe, failed=response.status_code >= 500, duration=latency)
+    gateway_metrics.upstream_latency.observe(agent_name, value=latency)
+
+    if not stream:
+        try:
+            await response.aread()
+        finally:
+            await response.aclose()
+            finish()
+        if affinity:
+            affinity.learn(response.content)
+    return response, finish
+
+
+async def open_inprocess(agent_name: str, body: bytes | None) -> InProcessAgentResponse:
+    """
+    Guards an in-process agent call with the agent's circuit breaker and
+    admission slot, then returns a response that runs the agent's A2A app
+    directly on the caller's connection, bounded by GATEWAY_UPSTREAM_TIMEOUT
+    like a pooled upstream call. Pass `body` if it was already read.
+    """
+    breaker, probe, admission, admitted_at = await guard_agent_call(agent_name)
+    logger.info(f"Gateway dispatching request for agent '{agent_name}' in-process")
+
+    response = InProcessAgentResponse(inprocess_apps[agent_name], body=body, timeout=settings.GATEWAY_UPSTREAM_TIMEOUT)
+
+    def finish(response: InProcessAgentResponse):
+        admission.release(admitted_at)
+        ended_at = response.headers_at or time.perf_counter()
+        latency = ended_at - response.started
+        breaker.record(probe, failed=response.headers_at is None or response.status_code >= 500, duration=latency)
+        gateway_metrics.upstream_latency.observe(agent_name, value=latency)
+
+    response.finish_callbacks.append(finish)
+    return response
+
+
+async def forward_buffered(
+    agent_name: str,
+    replica_set: ReplicaSet,
+    query: str,
+    body: bytes,
+    headers: dict,
+    affinity: TaskAffinity | None = None,
+    hedge: bool = False,
+) -> httpx.Response:
+    """
+    Sends an already-read request body upstream and reads the full reply.
+    With `hedge` set (only for idempotent message/send queries) and hedging
+    enabled for the agent, a call still unanswered after the hedge delay is
+    duplicated to a second replica and the first good reply wins. Calls
+    about a task or context one replica already holds are not hedged.
+    """
+    policy = hedge_policies.get(agent_name) if hedge else None
+    if policy is None or len(replica_set.replicas) < 2 or (affinity and replica_set.pinned(affinity.keys)):
+        response, _ = await open_upstream(
+            agent_name, replica_set, query, content=body, headers=headers, stream=False, affinity=affinity
+        )
+        return response
+
+    policy.on_request()
+
+    async def attempt(replica: Replica) -> tuple[httpx.Response, float, Replica]:
+        started = time.perf_counter()
+        response, _ = await open_upstream(
+            agent_name, replica_set, query, content=body, headers=headers, stream=False, replica=replica
+        )
+        return response, time.perf_counter() - started, replica
+
+    primary_replica = replica_set.pick()
+    primary = asyncio.create_task(attempt(primary_replica))
+    pending = {primary}
+    try:
+        done, _ = await asyncio.wait(pending, timeout=policy.hedge_delay())
+        if not done:
+            hedge_replica = replica_set.pick(exclude=(primary_replica,))
+            if hedge_replica is not None and policy.try_acquire_hedge():
+                logger.info(f"Hedging slow call to '{agent_name}' from {primary_replica.url} to {hedge_replica.url}")
+                pending.add(asyncio.create_task(attempt(hedge_replica)))
+
+        # Take the first successful reply; fall back to the last failure if none succeed
+        last_task = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                last_task = task
+                if task.exception() is None and task.result()[0].status_code < 500:
+                    response, latency, replica = task.result()
+                    policy.record_latency(latency)
+                    if task is not primary:
+                        policy.hedge_wins += 1
+                    if affinity:
+                        # Only the winning replica keeps the conversation
+                        affinity.bind(replica_set, replica)
+                        affinity.learn(response.content)
+                    return response
+        return last_task.result()[0]
+    finally:
+        # Cancel the losing (or abandoned) attempt; open_upstream frees its slots
+        for task in pending:
+            task.cancel()
+
+
+async def idempotent_agent_call(
+    agent_name: str,
+    replica_set: ReplicaSet,
+    request: Request,
+    payload: dict,
+    body: bytes,
+    headers: dict,
+    affinity: TaskAffinity | None = None,
+) -> Response | None:
+    """
+    Handles a `message/send` query that may be shared between callers: it is
+    served from the response cache when enabled for the agent, and identical
+    concurrent calls are coalesced into one upstream run when enabled.
+    Returns None when the message has no text to key on, or continues or
+    refers to an existing task (its reply depends on that task's state).
+    """
+    if carries_task_reference(payload):
+        return None
+    normalized_text = normalize_text(extract_user_text(payload))
+    if not normalized_text:
+        return None
+    region = extract_region(payload, request.headers)
+    query_key = ResponseCache.key_for(agent_name, region, normalized_text)
+    response_headers = {}
+
+    cache_enabled = response_cache.ttl_for(agent_name) is not None
+    if cache_enabled:
+        # 'Cache-Control: no-cache' skips the lookup but still refreshes the entry
+        bypass = "no-cache" in request.headers.get("cache-control", "").lower()
+        entry = None if bypass else response_cache.get(query_key)
+        if entry:
+            logger.info(f"Gateway served '{agent_name}' from cache for: '{normalized_text[:70]}'")
+            return Response(
+                content=rewrite_response_ids(entry.body, payload),
+                media_type=entry.content_type,
+                headers={"X-Cache": "HIT", "Age": str(int(time.monotonic() - entry.stored_at))},
+            )
+        response_headers["X-Cache"] = "BYPASS" if bypass else "MISS"
+
+    forward = lambda: forward_buffered(agent_name, replica_set, request.url.query, body, headers, affinity, hedge=True)
+    if agent_name in settings.GATEWAY_COALESCE_AGENTS:
+        response, shared = await single_flight.do(query_key, forward)
+    else:
+        response, shared = await forward(), False
+
+    content = response.content
+    if shared:
+        # Another caller's run answered this one; give this caller its own ids
+        logger.info(f"Gateway coalesced call to '{agent_name}' for: '{normalized_text[:70]}'")
+        response_headers["X-Coalesced"] = "true"
+        content = rewrite_response_ids(content, payload)
+    elif cache_enabled and response.status_code == 200 and is_completed_task_response(content):
+        response_cache.put(query_key, agent_name, content, response.headers.get("content-type", "application/json"))
+
+    return Response(
+        content=content,
+        status_code=response.status_code,
+        headers={**passthrough_headers(response, decoded=True), **response_headers},
+    )
+
+
+async def metered_request_body(request: Request, agent_name: str):
+    """Relays the incoming body stream while measuring its size."""
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        yield chunk
+    gateway_metrics.request_size.observe(agent_name, value=size)
+
+
+async def metered_response_body(body_iterator, agent_name: str):
+    """Relays a streamed response body, then records its size and ends the in-flight count."""
+    size = 0
+    try:
+        async for chunk in body_iterator:
+            size += len(chunk)
+            yield chunk
+    finally:
+        gateway_metrics.response_size.observe(agent_name, value=size)
+        gateway_metrics.in_flight.dec(agent_name)
 
 
 @app.post("/invoke/")
 async def proxy_agent_call(agent_name: str, request: Request):
     """
-    Receives an A2A call and forwards it to the correct internal agent.
+    Receives an A2A call and forwards it to the least busy healthy replica of
+    the agent, recording request counts, sizes and in-flight gauges.
     """
-    target_url = AGENT_URL_MAP.get(agent_name)
-    if not target_url:
+    metric_agent = agent_name if agent_name in AGENT_URL_MAP else "unknown"
+    gateway_metrics.in_flight.inc(metric_agent)
+    try:
+        response = await dispatch_agent_call(agent_name, request)
+    except BaseException:
+        gateway_metrics.in_flight.dec(metric_agent)
+        raise
+
+    if isinstance(response, InProcessAgentResponse):
+        # The status and sizes are only known once the agent app has run
+        response.finish_callbacks.append(lambda r: record_inprocess_metrics(metric_agent, r))
+        return response
+
+    gateway_metrics.requests.inc(metric_agent, str(response.status_code))
+    if isinstance(response, StreamingResponse):
+        response.body_iterator = metered_response_body(response.body_iterator, metric_agent)
+    else:
+        gateway_metrics.response_size.observe(metric_agent, value=len(response.body))
+        gateway_metrics.in_flight.dec(metric_agent)
+    return response
+
+
+def record_inprocess_metrics(agent_name: str, response: InProcessAgentResponse) -> None:
+    gateway_metrics.requests.inc(agent_name, str(response.status_code))
+    gateway_metrics.request_size.observe(agent_name, value=response.request_bytes)
+    gateway_metrics.response_size.observe(agent_name, value=response.response_bytes)
+    gateway_metrics.in_flight.dec(agent_name)
+
+
+async def dispatch_agent_call(agent_name: str, request: Request) -> Response:
+    """
+    Answers the call from cache or a coalesced run where allowed, otherwise
+    forwards it to the least busy healthy replica of the agent.
+    """
+    replica_set = replica_registry.get(agent_name)
+    if not replica_set:
         logger.error(f"Gateway received call for unknown agent: {agent_name}")
         return Response(content=f"Agent '{agent_name}' not found.", status_code=404)
 
-    async with httpx.AsyncClient(timeout=300.0) as client:
-        try:
+    # Filter headers to only include relevant ones like Content-Type and Accept
+    headers = {h: v for h, v in request.headers.items() if h.lower() in ['content-type', 'accept', 'authorization']} # Added authorization as it might be needed.
+
+    body = None
+    affinity = None
+    try:
+        if len(replica_set.replicas) > 1:
+            # Requests about a task or conversation must reach the replica that holds it, so the
+            # (small JSON-RPC) request body is read up front; replies still stream
             body = await request.body()
-            # Filter headers to only include relevant ones like Content-Type and Accept
-            headers = {h: v for h, v in request.headers.items() if h.lower() in ['content-type', 'accept', 'authorization']} # Added authorization as it might be needed.
-            
-            # Construct the full target URL by appending path and query from the original request
-            # The original request's path is usually empty for /invoke, but query params are important.
-            full_target_url = f"{target_url}?{request.url.query}"
-            
-            logger.info(f"Gateway proxying request for agent '{agent_name}' to internal URL: {full_target_url}")
-
-            response = await client.post(full_target_url, content=body, headers=headers)
-            
-            return Response(
-                content=response.content,
-                status_code=response.status_code,
-                headers=dict(response.headers)
+            rpc_payload = parse_jsonrpc_request(body)
+            if rpc_payload is not None:
+                affinity = TaskAffinity(affinity_keys(rpc_payload))
+
+        if (
+            response_cache.ttl_for(agent_name)
+            or agent_name in settings.GATEWAY_COALESCE_AGENTS
+            or agent_name in hedge_policies
+        ):
+            # Idempotent queries may be answered from cache, share another caller's agent run or be hedged
+            body = await request.body()
+            payload = parse_send_message_request(body)
+            if payload is not None:
+                shared_response = await idempotent_agent_call(
+                    agent_name, replica_set, request, payload, body, headers, affinity
+                )
+                if shared_response is not None:
+                    gateway_metrics.request_size.observe(agent_name, value=len(body))
+                    return shared_response
+
+        if agent_name in inprocess_apps and settings.GATEWAY_STREAMING_PASSTHROUGH:
+            # Hand the call to the agent's app on this connection; its SSE updates stream straight to the caller
+            return await open_inprocess(agent_name, body)
+
+        if settings.GATEWAY_STREAMING_PASSTHROUGH:
+            # Stream the incoming body upstream and relay the reply chunk by chunk,
+            # so A2A SSE status updates reach the caller as soon as the agent emits them.
+            if body is not None:
+                gateway_metrics.request_size.observe(agent_name, value=len(body))
+            upstream_response, finish = await open_upstream(
+                agent_name,
+                replica_set,
+                request.url.query,
+                content=body if body is not None else metered_request_body(request, agent_name),
+                headers=headers,
+                stream=True,
+                affinity=affinity,
+            )
+
+            def on_close():
+                if affinity:
+                    affinity.flush()
+                finish()
+
+            return StreamingResponse(
+                relay_upstream_body(upstream_response, on_close=on_close, on_chunk=affinity.feed if affinity else None),
+                status_code=upstream_response.status_code,
+                headers=passthrough_headers(upstream_response),
             )
-        except httpx.ConnectError:
-            logger.error(f"Gateway failed to connect to internal agent '{agent_name}' at {target_url}")
-            return Response(content=f"Service unavailable: Could not connect to {agent_name}.", status_code=503)
-        except Exception as e:
-            logger.error(f"Gateway encountered an unexpected error proxying to '{agent_name}': ", exc_info=True)
-            return Response(content="Internal server error in gateway.", status_code=500)
+
+        # Buffered mode: reuses a warm keep-alive connection from the backend's pool
+        body = await request.body()
+        gateway_metrics.request_size.observe(agent_name, value=len(body))
+        response = await forward_buffered(agent_name, replica_set, request.url.query, body, headers, affinity)
+        
+        return Response(
+            content=response.content,
+            status_code=response.status_code,
+            headers=passthrough_headers(response, decoded=True)
+        )
+    except CircuitOpen as e:
+        logger.warning(f"Gateway rejected request for '{agent_name}': circuit is open.")
+        return Response(
+            content=f"Service unavailable: {agent_name} is failing, retry later.",
+            status_code=503,
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except AdmissionRejected as e:
+        logger.warning(f"Gateway shed request for '{agent_name}': {e.reason}")
+        return Response(
+            content=f"Too many requests: {agent_name} is busy, retry later.",
+            status_code=429,
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except httpx.ConnectError as e:
+        logger.error(f"Gateway failed to connect to internal agent '{agent_name}' at {e.request.url}")
+        return Response(content=f"Service unavailable: Could not connect to {agent_name}.", status_code=503)
+    except Exception as e:
+        logger.error(f"Gateway encountered an unexpected error proxying to '{agent_name}': ", exc_info=True)
+        return Response(content="Internal server error in gateway.", status_code=500)
+
+@app.delete("/cache")
+async def purge_cache(agent_name: str | None = None):
+    """
+    Purges cached agent responses, for all agents or only `agent_name`.
+    """
+    return {"purged": response_cache.purge(agent_name)}
+
+@app.get("/stats")
+async def get_stats():
+    """
+    Exposes gateway runtime counters: upstream connection pool hits/misses and
+    per-replica health, in-flight requests and latency.
+    """
+    return {
+        "upstream_pools": upstream_pool.stats(),
+        "replicas": replica_registry.stats(),
+        "response_cache": response_cache.stats(),
+        "coalescing": single_flight.stats(),
+        "admission": admission_controller.stats(),
+        "hedging": {name: policy.stats() for name, policy in hedge_policies.items()},
+        "circuit_breakers": {name: breaker.stats() for name, breaker in circuit_breakers.items()},
+    }
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Prometheus text-format metrics: per-agent request counts by status, upstream
+    latency histograms, body sizes, in-flight requests, queue depth and breaker state.
+    """
+    return Response(content=gateway_metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 @app.get("/")
 def read_root():
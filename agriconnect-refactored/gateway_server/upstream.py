@@ -0,0 +1,198 @@
+# agriconnect-refactored/gateway_server/upstream.py
+
+import asyncio
+import logging
+from dataclasses import dataclass, asdict
+from typing import Callable, Iterable
+
+import httpx
+from common.http_support import HTTP2_AVAILABLE
+from common.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def origin_of(url: str) -> str:
+    """Returns the 'scheme://host:port' part of a URL, used as the pool key."""
+    parsed = httpx.URL(url)
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    return f"{parsed.scheme}://{parsed.host}:{port}"
+
+
+@dataclass
+class PoolStats:
+    """Counters for a single backend pool."""
+    requests: int = 0
+    hits: int = 0    # Request went out on an already-open keep-alive connection
+    misses: int = 0  # Request had to open a new TCP connection first
+    errors: int = 0
+
+
+class UpstreamPool:
+    """
+    Holds one long-lived httpx.AsyncClient per backend origin, so A2A calls
+    reuse warm keep-alive connections instead of a new socket per request.
+    Backends given in `asgi_apps` (URL -> ASGI app) are agents hosted inside
+    the gateway process and are called in memory with no socket at all.
+    """
+
+    def __init__(self, backend_urls: Iterable[str], asgi_apps: dict | None = None):
+        self._backend_origins = {origin_of(url) for url in backend_urls}
+        self._asgi_apps = {origin_of(url): asgi_app for url, asgi_app in (asgi_apps or {}).items()}
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._stats: dict[str, PoolStats] = {}
+
+    def _new_client(self, origin: str) -> httpx.AsyncClient:
+        asgi_app = self._asgi_apps.get(origin)
+        if asgi_app is not None:
+            return httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=asgi_app),
+                timeout=settings.GATEWAY_UPSTREAM_TIMEOUT,
+            )
+        limits = httpx.Limits(
+            max_connections=settings.GATEWAY_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.GATEWAY_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=settings.GATEWAY_POOL_KEEPALIVE_EXPIRY,
+        )
+        return httpx.AsyncClient(
+            timeout=settings.GATEWAY_UPSTREAM_TIMEOUT,
+            limits=limits,
+            http2=settings.GATEWAY_HTTP2 and HTTP2_AVAILABLE,
+        )
+
+    async def start(self) -> None:
+        """Creates the pools for all known backends. Called from the app lifespan."""
+        for origin in self._backend_origins:
+            self.client_for(origin)
+        logger.info(
+            f"Upstream pools ready for {len(self._clients)} backends "
+            f"(http2={settings.GATEWAY_HTTP2 and HTTP2_AVAILABLE}, "
+            f"max_connections={settings.GATEWAY_POOL_MAX_CONNECTIONS}, "
+            f"keepalive_expiry={settings.GATEWAY_POOL_KEEPALIVE_EXPIRY}s)"
+        )
+
+    async def aclose(self) -> None:
+        """Closes every pooled connection. Called on gateway shutdown."""
+        for origin, client in self._clients.items():
+            try:
+                await client.aclose()
+            except Exception:
+                logger.warning(f"Error closing upstream pool for {origin}", exc_info=True)
+        self._clients.clear()
+        logger.info("Upstream pools closed.")
+
+    def client_for(self, url: str) -> httpx.AsyncClient:
+        """Returns the pooled client for the URL's origin, creating it on first use."""
+        origin = origin_of(url)
+        client = self._clients.get(origin)
+        if client is None:
+            client = self._new_client(origin)
+            self._clients[origin] = client
+            self._stats.setdefault(origin, PoolStats())
+        return client
+
+    async def send(
+        self,
+        method: str,
+        url: str,
+        *,
+        content=None,
+        headers: dict | None = None,
+        stream: bool = False,
+    ) -> httpx.Response:
+        """
+        Sends a request through the backend's pool and records whether a
+        kept-alive connection was reused (hit) or a new one opened (miss).
+        Failed sends count as errors only, so an outage does not look like
+        connection reuse. In-process apps get the same GATEWAY_UPSTREAM_TIMEOUT,
+        which httpx does not enforce for them, and fail with httpx.ReadTimeout.
+        """
+        client = self.client_for(url)
+        origin = origin_of(url)
+        stats = self._stats[origin]
+        opened_connection = False
+
+        async def trace(event_name: str, info: dict) -> None:
+            nonlocal opened_connection
+            if event_name == "connection.connect_tcp.started":
+                opened_connection = True
+
+        request = client.build_request(
+            method, url, content=content, headers=headers, extensions={"trace": trace}
+        )
+        stats.requests += 1
+        timeout = settings.GATEWAY_UPSTREAM_TIMEOUT if origin in self._asgi_apps else None
+        try:
+            async with asyncio.timeout(timeout) as deadline:
+                response = await client.send(request, stream=stream)
+        except TimeoutError as e:
+            stats.errors += 1
+            if not deadline.expired():
+                raise
+            raise httpx.ReadTimeout(f"In-process agent did not reply within {timeout}s", request=request) from e
+        except Exception:
+            stats.errors += 1
+            raise
+        if opened_connection:
+            stats.misses += 1
+        else:
+            stats.hits += 1
+        return response
+
+    def stats(self) -> dict:
+        """Returns per-backend hit/miss counters for the /stats endpoint."""
+        result = {}
+        for origin, stats in self._stats.items():
+            data = asdict(stats)
+            sent = stats.hits + stats.misses
+            data["hit_ratio"] = round(stats.hits / sent, 4) if sent else None
+            result[origin] = data
+        return result
+
+
+# Headers that describe a single connection hop and must not be relayed (RFC 9110 7.6.1)
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailer", "transfer-encoding", "upgrade",
+}
+# Headers the gateway's own server sets on every response
+SERVER_SET_HEADERS = {"date", "server"}
+
+
+def passthrough_headers(response: httpx.Response, decoded: bool = False) -> dict:
+    """
+    Returns the upstream response headers that are safe to relay to the caller.
+    When the body was read via `response.content` it is already decoded, so the
+    original length and encoding headers no longer apply.
+    """
+    dropped = HOP_BY_HOP_HEADERS | SERVER_SET_HEADERS
+    if decoded:
+        dropped |= {"content-length", "content-encoding"}
+    headers = {k: v for k, v in response.headers.items() if k.lower() not in dropped}
+    if response.headers.get("content-type", "").startswith("text/event-stream"):
+        # Keep SSE flushing intact through any buffering proxy in front of the gateway
+        headers["Cache-Control"] = "no-cache"
+        headers["X-Accel-Buffering"] = "no"
+    return headers
+
+
+async def relay_upstream_body(
+    response: httpx.Response,
+    on_close: Callable[[], None] | None = None,
+    on_chunk: Callable[[bytes], None] | None = None,
+):
+    """
+    Yields the raw upstream body chunk by chunk as it arrives and always returns
+    the connection to the pool, even if the caller disconnects mid-stream.
+    `on_chunk` sees every chunk before it is relayed; `on_close` runs once the
+    body is finished or abandoned.
+    """
+    try:
+        async for chunk in response.aiter_raw():
+            if on_chunk:
+                on_chunk(chunk)
+            yield chunk
+    finally:
+        await response.aclose()
+        if on_close:
+            on_close()
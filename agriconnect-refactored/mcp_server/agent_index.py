@@ -0,0 +1,179 @@
+# mcp_server/agent_index.py
+
+import numpy as np
+
+# ivf_index uses l2_normalize from here, so both sides import the module rather than its names
+from . import ivf_index
+from .lexical_index import LexicalIndex
+
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scales each row to unit length (zero rows are left as zeros)."""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+class AgentIndex:
+    """
+    Immutable routing index: the agent cards plus their embeddings as one
+    contiguous, L2-normalized float32 matrix built once at load, so scoring
+    a query is a single matrix-vector product giving cosine similarities.
+    A BM25 index over the same cards, in the same order, sits alongside it.
+
+    A card may own several vectors (e.g. one per skill and per example),
+    given by `owners` (the card position of each embedding row). Its score
+    is then the best similarity of any of its vectors, or with top_m > 1
+    the mean of its top_m best. `texts` optionally names the text behind
+    each row, so a rebuilt index can reuse vectors whose text is unchanged.
+    A card with no vectors yet (its texts could not be embedded) scores -1
+    but stays in the BM25 index, so it can still be routed lexically.
+
+    With at least `ann_min_vectors` rows (0 disables it), queries go through
+    an IVF approximate-nearest-neighbour index instead of scoring every row:
+    only the `ann_candidates` best rows are scored exactly and aggregated
+    with max-sim; cards without a candidate score -1. Pass the index being
+    replaced as `ann_previous` to update a copy of its IVF index in place of
+    building a new one: rows are keyed by (card name, text), only new keys
+    are inserted and vanished ones deleted. The centroids are retrained when
+    the number of vectors has drifted too far from what they were sized for.
+    """
+
+    def __init__(
+        self,
+        cards: list[dict],
+        embeddings,
+        owners=None,
+        top_m: int = 1,
+        texts: list[str] | None = None,
+        ann_min_vectors: int = 0,
+        ann_probes: int = 8,
+        ann_candidates: int = 64,
+        ann_previous: "AgentIndex | None" = None,
+    ):
+        self.cards = list(cards)
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        owners = np.arange(len(self.cards)) if owners is None else np.asarray(owners, dtype=np.intp)
+        matrix = matrix.reshape(len(owners), -1) if len(owners) else matrix.reshape(0, 0)
+        self.counts = np.bincount(owners, minlength=len(self.cards))
+        self.embedded = np.flatnonzero(self.counts)
+        self.one_per_card = bool((self.counts == 1).all())
+
+        # Group each card's rows together so per-card aggregation is a reduceat
+        order = np.argsort(owners, kind="stable")
+        self.owners = owners[order]
+        self.matrix = np.ascontiguousarray(l2_normalize(matrix[order]))
+        self.texts = [texts[i] for i in order] if texts is not None else None
+        self.starts = np.concatenate(([0], np.cumsum(self.counts)[:-1])).astype(np.intp)
+        # Column of each row in a (cards x max vectors per card) layout, for top-m
+        self.slots = np.arange(len(self.owners)) - self.starts[self.owners]
+        self.top_m = max(top_m, 1)
+        self.lexical = LexicalIndex(self.cards)
+
+        self.ann: ivf_index.IVFIndex | None = None
+        self.ann_candidates = ann_candidates
+        # Stable IVF id of each (card name, text) key, and the row behind each id
+        self.ann_ids: dict[tuple[str, str], int] = {}
+        self.next_ann_id = 0
+        self.row_of_ann_id = np.empty(0, dtype=np.intp)
+        if ann_min_vectors and len(self.matrix) >= ann_min_vectors:
+            self._build_ann(ann_probes, ann_previous)
+
+    def _build_ann(self, n_probe: int, previous: "AgentIndex | None") -> None:
+        keys = None
+        if self.texts is not None:
+            keys = [(self.cards[owner].get("name"), text) for owner, text in zip(self.owners, self.texts)]
+            if len(set(keys)) != len(keys):
+                keys = None  # Duplicate card names: rows cannot be told apart across rebuilds
+        reusable = (
+            keys is not None
+            and previous is not None
+            and previous.ann is not None
+            and previous.ann_ids
+            and previous.ann.centroids.shape[1] == self.matrix.shape[1]
+            and not ivf_index.needs_retrain(len(previous.ann.centroids), len(self.matrix))
+        )
+        if reusable:
+            self.ann = previous.ann.copy()
+            ids = np.array([previous.ann_ids.get(key, -1) for key in keys], dtype=np.int64)
+            new = np.flatnonzero(ids < 0)
+            ids[new] = np.arange(previous.next_ann_id, previous.next_ann_id + len(new))
+            current = set(keys)
+            self.ann.delete([i for key, i in previous.ann_ids.items() if key not in current])
+            self.ann.insert(ids[new], self.matrix[new])
+        else:
+            self.ann = ivf_index.IVFIndex.train(self.matrix, ivf_index.default_n_lists(len(self.matrix)), n_probe)
+            ids = np.arange(len(self.matrix), dtype=np.int64)
+            self.ann.insert(ids, self.matrix)
+        if keys is not None:
+            self.ann_ids = dict(zip(keys, ids.tolist()))
+        self.next_ann_id = int(ids.max()) + 1
+        self.row_of_ann_id = np.full(self.next_ann_id, -1, dtype=np.intp)
+        self.row_of_ann_id[ids] = np.arange(len(ids))
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def vectors_by_text(self) -> dict:
+        """Maps each embedded text to its (normalized) vector."""
+        if self.texts is None:
+            return {}
+        return dict(zip(self.texts, self.matrix))
+
+    def vectors_by_card(self) -> dict[str, tuple[list[str], np.ndarray]]:
+        """Maps each embedded card's name to its texts and (normalized) vectors."""
+        if self.texts is None:
+            return {}
+        return {
+            card.get("name"): (self.texts[start:start + count], self.matrix[start:start + count])
+            for card, start, count in zip(self.cards, self.starts, self.counts)
+            if count
+        }
+
+    def scores(self, query_embedding) -> np.ndarray:
+        """Cosine similarity of the query to every card (aggregated over the card's vectors)."""
+        query = l2_normalize(np.asarray(query_embedding, dtype=np.float32))
+        card_scores = np.full(len(self.cards), -1.0, dtype=np.float32)
+        if not len(self.matrix):
+            return card_scores
+        if self.ann is not None:
+            ids, similarities = self.ann.search(query, self.ann_candidates)
+            rows = self.row_of_ann_id[ids]
+            np.maximum.at(card_scores, self.owners[rows], similarities)
+            return card_scores
+
+        similarities = self.matrix @ query
+        if self.one_per_card:
+            return similarities
+        if self.top_m == 1:
+            # Cards without vectors own no rows, so the embedded cards' starts delimit every segment
+            card_scores[self.embedded] = np.maximum.reduceat(similarities, self.starts[self.embedded])
+            return card_scores
+
+        # Mean of each card's top m similarities; cards with fewer vectors average what they have
+        padded = np.full((len(self.cards), int(self.counts.max())), -np.inf, dtype=np.float32)
+        padded[self.owners, self.slots] = similarities
+        m = min(self.top_m, padded.shape[1])
+        top = -np.partition(-padded, m - 1, axis=1)[:, :m]
+        top[np.isinf(top)] = 0.0
+        card_scores[self.embedded] = top.sum(axis=1)[self.embedded] / np.minimum(self.counts[self.embedded], m)
+        return card_scores
+
+    def search(self, query_embedding, k: int = 1) -> list[tuple[dict, float]]:
+        """Returns up to k (card, cosine score) pairs, best first."""
+        if not self.cards:
+            return []
+        return self.rank(self.scores(query_embedding), k)
+
+    def rank(self, scores: np.ndarray, k: int = 1) -> list[tuple[dict, float]]:
+        """Returns up to k (card, score) pairs for per-card scores, best first."""
+        return [(self.cards[i], score) for i, score in self.top(scores, k)]
+
+    def top(self, scores: np.ndarray, k: int = 1) -> list[tuple[int, float]]:
+        """Returns up to k (card position, score) pairs for per-card scores, best first."""
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        # argpartition finds the top k in O(n); only those k are then sorted
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top]
@@ -0,0 +1,85 @@
+# mcp_server/bench_ann.py
+
+"""
+Benchmarks the IVF agent index against brute-force cosine search: recall@k
+and query latency (p50/p99) at growing registry sizes, plus build, insert
+and delete cost. Vectors are synthetic and clustered, like cards for many
+crops and regions that share a handful of specialities:
+
+    python -m mcp_server.bench_ann -n 1000 -n 10000 -n 100000
+"""
+
+import time
+
+import click
+import numpy as np
+
+from mcp_server.agent_index import l2_normalize
+from mcp_server.ivf_index import IVFIndex, default_n_lists
+
+
+def clustered_vectors(rng, n: int, dim: int, n_clusters: int, spread: float) -> np.ndarray:
+    centers = rng.normal(size=(n_clusters, dim))
+    return centers[rng.integers(n_clusters, size=n)] + spread * rng.normal(size=(n, dim))
+
+
+def percentile_ms(samples: list[float], q: float) -> float:
+    return float(np.percentile(samples, q)) * 1000
+
+
+@click.command()
+@click.option("--sizes", "-n", multiple=True, type=int, default=(1000, 10000, 100000), help="Number of card vectors.")
+@click.option("--dim", default=256, help="Embedding dimension.")
+@click.option("--queries", default=200, help="Queries per size.")
+@click.option("-k", default=10, help="Neighbours per query for recall@k.")
+@click.option("--n-probe", default=8, help="Inverted lists scanned per query.")
+def main(sizes, dim, queries, k, n_probe):
+    """Prints recall@k and latency of IVF search vs brute force."""
+    rng = np.random.default_rng(0)
+    print(
+        f"{'cards':>8}{'lists':>7}{'build s':>9}{'recall@' + str(k):>11}"
+        f"{'brute p50':>11}{'brute p99':>11}{'ivf p50':>9}{'ivf p99':>9}{'ins/s':>10}{'del/s':>10}"
+    )
+    for n in sizes:
+        vectors = l2_normalize(clustered_vectors(rng, n, dim, n_clusters=max(n // 50, 8), spread=1.0).astype(np.float32))
+        # Queries near (not at) stored cards: unit vectors plus noise of norm ~0.3
+        query_set = l2_normalize((vectors[rng.choice(n, queries)] + 0.3 / np.sqrt(dim) * rng.normal(size=(queries, dim))).astype(np.float32))
+
+        started = time.perf_counter()
+        n_lists = default_n_lists(n)
+        index = IVFIndex.train(vectors, n_lists=n_lists, n_probe=n_probe)
+        index.insert(np.arange(n), vectors)
+        build_s = time.perf_counter() - started
+
+        brute_times, ivf_times, recalls = [], [], []
+        for query in query_set:
+            started = time.perf_counter()
+            scores = vectors @ query
+            exact = np.argpartition(-scores, k - 1)[:k]
+            brute_times.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            ids, _ = index.search(query, k)
+            ivf_times.append(time.perf_counter() - started)
+            recalls.append(len(np.intersect1d(exact, ids)) / k)
+
+        # Incremental updates: replace 1% of the cards with new ones
+        batch = max(n // 100, 1)
+        started = time.perf_counter()
+        index.insert(np.arange(n, n + batch), clustered_vectors(rng, batch, dim, 8, 0.6))
+        insert_rate = batch / (time.perf_counter() - started)
+        started = time.perf_counter()
+        index.delete(range(batch))
+        delete_rate = batch / (time.perf_counter() - started)
+
+        print(
+            f"{n:>8}{n_lists:>7}{build_s:>9.2f}{np.mean(recalls):>11.3f}"
+            f"{percentile_ms(brute_times, 50):>11.3f}{percentile_ms(brute_times, 99):>11.3f}"
+            f"{percentile_ms(ivf_times, 50):>9.3f}{percentile_ms(ivf_times, 99):>9.3f}"
+            f"{insert_rate:>10.0f}{delete_rate:>10.0f}"
+        )
+    print(f"(dim {dim}, n_probe {n_probe}, {queries} queries, latencies in ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# mcp_server/bench_find_agent.py
+
+"""
+Benchmarks concurrent find_agent throughput with the embedding call made
+inline on the event loop (how the sync tool used to run), off the loop on
+the embedding thread pool, and micro-batched across concurrent queries.
+
+The embedding API is replaced by a provider that sleeps for --latency-ms,
+so the numbers are deterministic and need no network access:
+
+    python -m mcp_server.bench_find_agent -c 1 -c 8 -c 32
+"""
+
+import asyncio
+import json
+import time
+import uuid
+
+import click
+import numpy as np
+
+from mcp_server import server
+from mcp_server.agent_index import AgentIndex
+from mcp_server.embedding_providers import EmbeddingProvider
+
+EMBEDDING_DIM = 768
+# Texts per simulated embedding API call
+calls: list[int] = []
+
+
+class SimulatedRemoteProvider(EmbeddingProvider):
+    """Stands in for a remote embedding API with a fixed round-trip time."""
+
+    name = "simulated-remote"
+
+    def __init__(self, latency_s: float):
+        self.latency_s = latency_s
+
+    def embed_queries(self, texts: list[str]) -> list:
+        time.sleep(self.latency_s)  # Blocks the calling thread, like the real HTTP client
+        calls.append(len(texts))
+        return np.random.default_rng().normal(size=(len(texts), EMBEDDING_DIM)).tolist()
+
+    embed_documents = embed_queries
+
+
+async def blocking_find_agent(query: str) -> str:
+    """The previous sync tool body: the embedding call blocks the event loop."""
+    query_embedding = server.embedding_provider.embed_queries([query])[0]
+    card, _ = server.agent_index.search(query_embedding, k=1)[0]
+    return json.dumps(card)
+
+
+async def run_load(find, concurrency: int, requests: int) -> dict:
+    latencies = []
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        # Unique queries so the query embedding cache never answers
+        queue.put_nowait(f"price of onion {uuid.uuid4()}")
+
+    async def worker():
+        while not queue.empty():
+            query = queue.get_nowait()
+            started = time.perf_counter()
+            await find(query)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "throughput": requests / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)) * 1000,
+        "p99_ms": float(np.percentile(latencies, 99)) * 1000,
+    }
+
+
+@click.command()
+@click.option("--concurrency", "-c", multiple=True, type=int, default=(1, 8, 32), help="Concurrent sessions.")
+@click.option("--requests", "-n", default=200, help="find_agent calls per run.")
+@click.option("--latency-ms", default=50.0, help="Simulated embedding API latency.")
+@click.option("--cards", default=3, help="Number of agent cards in the index.")
+def main(concurrency, requests, latency_ms, cards):
+    """Prints find_agent throughput and latency for each embedding mode."""
+    rng = np.random.default_rng(0)
+    server.agent_index = AgentIndex(
+        [{"name": f"agent_{i}", "url": f"http://gateway/invoke/?agent_name=agent_{i}"} for i in range(cards)],
+        rng.normal(size=(cards, EMBEDDING_DIM)),
+    )
+    server.embedding_provider = SimulatedRemoteProvider(latency_ms / 1000)
+    # Measure the embedding path; a clear lexical match would skip it entirely
+    server.settings.MCP_LEXICAL_ROUTING = False
+
+    batcher = server.query_embedding_batcher or server.EmbeddingBatcher(
+        server.embed_queries, server.embedding_executor, window=0.005, max_batch=32
+    )
+    modes = (
+        ("blocking", blocking_find_agent, None),
+        ("async", server.find_agent, None),
+        ("batched", server.find_agent, batcher),
+    )
+    print(f"{'mode':<10}{'sessions':>9}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'API calls':>11}")
+    for mode, find, mode_batcher in modes:
+        server.query_embedding_batcher = mode_batcher
+        for c in concurrency:
+            calls.clear()
+            result = asyncio.run(run_load(find, c, requests))
+            print(
+                f"{mode:<10}{c:>9}{result['throughput']:>10.1f}{result['p50_ms']:>10.1f}"
+                f"{result['p99_ms']:>10.1f}{len(calls):>11}"
+            )
+    print(
+        f"(embedding latency {latency_ms} ms, MCP_EMBEDDING_WORKERS={server.settings.MCP_EMBEDDING_WORKERS}, "
+        f"batch window {batcher.window * 1000:g} ms)"
+    )
+
+
+if __name__ == "__main__":
+    main()
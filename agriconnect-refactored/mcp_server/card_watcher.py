@@ -0,0 +1,88 @@
+# mcp_server/card_watcher.py
+
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class CardDirectoryWatcher:
+    """
+    Polls the agent cards directory from a background thread and reports
+    which *.json files were added, changed or removed. A file is only
+    re-hashed when its mtime or size moved, and it only counts as changed
+    when its content hash differs, so touching a file is not a change.
+    While `needs_retry()` is true (e.g. some card texts could not be
+    embedded), on_change is also called with no changes on every scan.
+    """
+
+    def __init__(
+        self,
+        cards_dir: Path,
+        interval: float,
+        on_change: Callable[[list[str], list[str], list[str]], None],
+        needs_retry: Callable[[], bool] | None = None,
+    ):
+        self.cards_dir = Path(cards_dir)
+        self.interval = interval
+        self.on_change = on_change
+        self.needs_retry = needs_retry
+        self._stats: dict[str, tuple[int, int]] = {}
+        self._hashes: dict[str, str] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _scan(self) -> dict[str, str]:
+        stats, hashes = {}, {}
+        for path in sorted(self.cards_dir.glob("*.json")):
+            try:
+                stat = path.stat()
+                stats[path.name] = (stat.st_mtime_ns, stat.st_size)
+                if stats[path.name] == self._stats.get(path.name):
+                    hashes[path.name] = self._hashes[path.name]
+                else:
+                    hashes[path.name] = hashlib.sha256(path.read_bytes()).hexdigest()
+            except FileNotFoundError:
+                stats.pop(path.name, None)  # Deleted between glob and read
+        self._stats = stats
+        return hashes
+
+    def prime(self) -> None:
+        """Records the current directory state as the baseline (called after the initial load)."""
+        self._hashes = self._scan()
+
+    def check(self) -> bool:
+        """Scans once and calls on_change if any card file differs or a retry is due. Returns True if it did."""
+        hashes = self._scan()
+        added = sorted(hashes.keys() - self._hashes.keys())
+        removed = sorted(self._hashes.keys() - hashes.keys())
+        changed = sorted(name for name in hashes.keys() & self._hashes.keys() if hashes[name] != self._hashes[name])
+        if not (added or changed or removed or (self.needs_retry and self.needs_retry())):
+            return False
+        try:
+            self.on_change(added, changed, removed)
+        except Exception:
+            # Keep the old baseline so the change is picked up again on the next scan
+            self._stats = {}
+            raise
+        self._hashes = hashes
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                logger.error("Reloading agent cards failed; keeping the current index.", exc_info=True)
+
+    def start(self) -> None:
+        self.prime()
+        self._thread = threading.Thread(target=self._run, name="agent-card-watcher", daemon=True)
+        self._thread.start()
+        logger.info(f"Watching {self.cards_dir} for agent card changes every {self.interval}s")
+
+    def stop(self) -> None:
+        self._stop.set()
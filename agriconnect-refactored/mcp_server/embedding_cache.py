@@ -0,0 +1,66 @@
+# mcp_server/embedding_cache.py
+
+import hashlib
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Content-addressed on-disk store of embeddings, one .npy file per vector.
+    The key is a hash of the embedding model and the exact text, so an
+    unchanged agent card is never re-embedded and a new model never reuses
+    vectors from an old one.
+    """
+
+    def __init__(self, cache_dir: str | Path):
+        self.cache_dir = Path(cache_dir)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(text: str, model: str) -> str:
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def _path_for(self, key: str) -> Path:
+        # Fan out into sub-directories so no single directory grows huge
+        return self.cache_dir / key[:2] / f"{key}.npy"
+
+    def get(self, text: str, model: str) -> np.ndarray | None:
+        path = self._path_for(self.key_for(text, model))
+        try:
+            # Read eagerly: a memory map would hold one open file descriptor per cached vector
+            vector = np.load(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except ValueError:
+            logger.warning(f"Ignoring corrupt embedding cache file {path}", exc_info=True)
+            self.misses += 1
+            return None
+        except OSError:
+            logger.warning(f"Could not read embedding cache file {path}", exc_info=True)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return vector
+
+    def put(self, text: str, model: str, vector) -> None:
+        path = self._path_for(self.key_for(text, model))
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temp file and rename, so readers never see a partial file
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with tmp_path.open("wb") as f:
+                np.save(f, np.asarray(vector, dtype=np.float32))
+            os.replace(tmp_path, path)
+        except OSError:
+            logger.warning(f"Could not write embedding cache file {path}", exc_info=True)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,114 @@
+# mcp_server/embedding_providers.py
+
+import logging
+import math
+import re
+import unicodedata
+import zlib
+from abc import ABC, abstractmethod
+from collections import Counter
+
+import numpy as np
+
+from common.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingProvider(ABC):
+    """
+    Turns texts into embedding vectors for the MCP router. `name` identifies
+    the model and is part of every embedding cache key, so switching provider
+    never reuses another provider's vectors.
+    """
+
+    name: str
+
+    def configure(self) -> None:
+        """One-time setup before the first call (credentials etc.)."""
+
+    @abstractmethod
+    def embed_documents(self, texts: list[str]) -> list:
+        """Embeds agent card texts; returns one vector per text."""
+
+    @abstractmethod
+    def embed_queries(self, texts: list[str]) -> list:
+        """Embeds routing queries; returns one vector per text."""
+
+
+class GoogleEmbeddingProvider(EmbeddingProvider):
+    """Gemini embeddings through google.generativeai (needs network access and GOOGLE_API_KEY)."""
+
+    def __init__(self, model: str):
+        # Imported here so the local provider works without the Google SDK installed
+        import google.generativeai as genai
+        self.genai = genai
+        self.name = model
+
+    def configure(self) -> None:
+        if not settings.GOOGLE_API_KEY:
+            raise ValueError("GOOGLE_API_KEY is not set")
+        self.genai.configure(api_key=settings.GOOGLE_API_KEY)
+
+    def _embed(self, texts: list[str], task_type: str) -> list:
+        return self.genai.embed_content(model=self.name, content=texts, task_type=task_type)["embedding"]
+
+    def embed_documents(self, texts: list[str]) -> list:
+        return self._embed(texts, "retrieval_document")
+
+    def embed_queries(self, texts: list[str]) -> list:
+        return self._embed(texts, "retrieval_query")
+
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+class HashedNgramEmbeddingProvider(EmbeddingProvider):
+    """
+    Offline, deterministic embeddings: word unigrams, word bigrams and
+    character n-grams are hashed (signed feature hashing, i.e. a sparse
+    random projection) into `dim` dimensions with log-scaled term
+    frequencies. Runs on the local CPU in microseconds per text, so routing
+    works air-gapped and its latency can be measured without a network.
+    """
+
+    def __init__(self, dim: int, char_ngrams: tuple[int, int] = (3, 5)):
+        self.dim = dim
+        self.char_ngrams = char_ngrams
+        self.name = f"local/hashed-ngram-v1-d{dim}-c{char_ngrams[0]}{char_ngrams[1]}"
+
+    def _features(self, text: str) -> Counter:
+        words = _WORD_RE.findall(unicodedata.normalize("NFKC", text).casefold())
+        features = Counter(f"w:{w}" for w in words)
+        features.update(f"b:{a} {b}" for a, b in zip(words, words[1:]))
+        low, high = self.char_ngrams
+        for word in words:
+            padded = f"<{word}>"
+            for n in range(low, high + 1):
+                features.update(f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1))
+        return features
+
+    def _embed_one(self, text: str) -> list:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, count in self._features(text).items():
+            # crc32 is stable across processes (unlike hash()); the top bit picks the sign
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % self.dim] += (1.0 if h & 0x80000000 else -1.0) * (1.0 + math.log(count))
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list:
+        return [self._embed_one(t) for t in texts]
+
+    def embed_queries(self, texts: list[str]) -> list:
+        return [self._embed_one(t) for t in texts]
+
+
+def get_embedding_provider() -> EmbeddingProvider:
+    """The provider selected by MCP_EMBEDDING_PROVIDER ('google' or 'local')."""
+    provider = settings.MCP_EMBEDDING_PROVIDER.lower()
+    if provider == "google":
+        return GoogleEmbeddingProvider(settings.GOOGLE_EMBEDDING_MODEL)
+    if provider == "local":
+        return HashedNgramEmbeddingProvider(settings.MCP_LOCAL_EMBEDDING_DIM)
+    raise ValueError(f"Unknown MCP_EMBEDDING_PROVIDER '{settings.MCP_EMBEDDING_PROVIDER}' (expected 'google' or 'local')")
@@ -0,0 +1,78 @@
+# mcp_server/embedding_retries.py
+
+import time
+from typing import Callable, Iterable
+
+
+class EmbeddingRetries:
+    """
+    Decides when card texts that could not be embedded are tried again.
+    A text the API rejects on its own waits base_delay * 2^(failures - 1)
+    (capped at max_delay) before its next attempt, and after max_failures
+    it is given up on until forget() is called for it (its card changed).
+    While the API is down every text waits for one shared backoff instead,
+    which does not count towards any text's failures.
+    """
+
+    def __init__(
+        self,
+        base_delay: float,
+        max_delay: float,
+        max_failures: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_failures = max(max_failures, 1)
+        self.clock = clock
+        # text -> (failures, monotonic time of the next attempt)
+        self._failures: dict[str, tuple[int, float]] = {}
+        self._api_failures = 0
+        self._api_retry_at = 0.0
+        self._missing: set[str] = set()
+
+    def _delay(self, failures: int) -> float:
+        return min(self.base_delay * 2 ** (failures - 1), self.max_delay)
+
+    def is_due(self, text: str) -> bool:
+        """True if the text may be sent to the embedding API now."""
+        now = self.clock()
+        if now < self._api_retry_at:
+            return False
+        failures, retry_at = self._failures.get(text, (0, 0.0))
+        return failures < self.max_failures and now >= retry_at
+
+    def succeeded(self, text: str) -> None:
+        self._failures.pop(text, None)
+
+    def text_failed(self, text: str) -> None:
+        failures = self._failures.get(text, (0, 0.0))[0] + 1
+        self._failures[text] = (failures, self.clock() + self._delay(failures))
+
+    def api_down(self) -> None:
+        self._api_failures += 1
+        self._api_retry_at = self.clock() + self._delay(self._api_failures)
+
+    def api_up(self) -> None:
+        self._api_failures = 0
+        self._api_retry_at = 0.0
+
+    def forget(self, texts: Iterable[str]) -> None:
+        """Gives the texts a fresh start, e.g. because their card was edited."""
+        for text in texts:
+            self._failures.pop(text, None)
+
+    def set_missing(self, texts: Iterable[str]) -> None:
+        """Records which card texts the live index is missing."""
+        self._missing = set(texts)
+
+    def retry_due(self) -> bool:
+        """True if any missing text is due for another attempt."""
+        return any(self.is_due(text) for text in self._missing)
+
+    def stats(self) -> dict:
+        return {
+            "missing": len(self._missing),
+            "given_up": sum(1 for failures, _ in self._failures.values() if failures >= self.max_failures),
+            "api_retry_in_s": round(max(self._api_retry_at - self.clock(), 0.0), 1),
+        }
@@ -0,0 +1,164 @@
+# mcp_server/ivf_index.py
+
+import math
+
+import numpy as np
+
+from . import agent_index
+
+# Rows assigned to centroids per chunk during k-means, bounding the temp score matrix
+ASSIGN_CHUNK_ROWS = 4096
+# Compact the inverted lists once this fraction of stored rows has been deleted
+COMPACT_DEAD_FRACTION = 0.2
+# Retrain once the number of lists is this many times too few or too many for the stored vectors
+RETRAIN_FACTOR = 2.0
+
+
+def default_n_lists(n_vectors: int) -> int:
+    """About 4 * sqrt(n) lists keeps both the centroid scan and each list short."""
+    return max(1, int(4 * math.sqrt(n_vectors)))
+
+
+def needs_retrain(n_lists: int, n_vectors: int) -> bool:
+    """True when n_lists centroids no longer suit n_vectors (the lists grew too long or too short)."""
+    target = default_n_lists(n_vectors)
+    return not target / RETRAIN_FACTOR <= n_lists <= target * RETRAIN_FACTOR
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the most similar centroid for each (normalized) vector."""
+    assignment = np.empty(len(vectors), dtype=np.intp)
+    for start in range(0, len(vectors), ASSIGN_CHUNK_ROWS):
+        chunk = vectors[start:start + ASSIGN_CHUNK_ROWS]
+        assignment[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignment
+
+
+class IVFIndex:
+    """
+    Inverted-file approximate nearest-neighbour index for cosine similarity,
+    in plain NumPy. Vectors are bucketed by their nearest k-means centroid; a
+    query scores the centroids, then only the vectors in the n_probe closest
+    buckets. Inserts and deletes are incremental and keyed by integer id.
+    """
+
+    def __init__(self, centroids: np.ndarray, n_probe: int):
+        self.centroids = np.ascontiguousarray(agent_index.l2_normalize(np.asarray(centroids, dtype=np.float32)))
+        self.n_probe = max(1, min(n_probe, len(self.centroids)))
+        dim = self.centroids.shape[1]
+        self._vectors = np.empty((0, dim), dtype=np.float32)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._alive = np.empty(0, dtype=bool)
+        self._size = 0  # Rows used in the arrays above (they grow with spare capacity)
+        self._lists = [np.empty(0, dtype=np.intp) for _ in range(len(self.centroids))]
+        self._row_of: dict[int, int] = {}
+        self._dead = 0
+
+    @classmethod
+    def train(cls, vectors, n_lists: int, n_probe: int, iterations: int = 10, sample_size: int | None = None, seed: int = 0) -> "IVFIndex":
+        """Learns centroids with spherical k-means on (a sample of) the vectors."""
+        vectors = agent_index.l2_normalize(np.asarray(vectors, dtype=np.float32))
+        rng = np.random.default_rng(seed)
+        n_lists = max(1, min(n_lists, len(vectors)))
+        sample_size = sample_size or 64 * n_lists
+        if len(vectors) > sample_size:
+            vectors = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = _assign(vectors, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, vectors)
+            empty = ~np.bincount(assignment, minlength=n_lists).astype(bool)
+            # Re-seed empty buckets with random points so no list stays unused
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+            centroids = agent_index.l2_normalize(sums)
+        return cls(centroids, n_probe)
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def copy(self) -> "IVFIndex":
+        """An independent copy (sharing the centroids), to update while the original keeps serving."""
+        clone = IVFIndex.__new__(IVFIndex)
+        clone.__dict__.update(self.__dict__)
+        clone._vectors = self._vectors.copy()
+        clone._ids = self._ids.copy()
+        clone._alive = self._alive.copy()
+        # The lists' arrays are replaced rather than modified on update, so a shallow copy is enough
+        clone._lists = list(self._lists)
+        clone._row_of = dict(self._row_of)
+        return clone
+
+    def _reserve(self, extra: int) -> None:
+        needed = self._size + extra
+        if needed <= len(self._ids):
+            return
+        capacity = max(needed, 2 * len(self._ids), 1024)
+        vectors = np.empty((capacity, self._vectors.shape[1]), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        ids = np.empty(capacity, dtype=np.int64)
+        ids[:self._size] = self._ids[:self._size]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self._size] = self._alive[:self._size]
+        self._vectors, self._ids, self._alive = vectors, ids, alive
+
+    def insert(self, ids, vectors) -> None:
+        """Adds vectors under the given ids (an existing id is replaced)."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(ids):
+            return
+        vectors = agent_index.l2_normalize(np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1))
+        self.delete([i for i in ids.tolist() if i in self._row_of])
+        self._reserve(len(ids))
+        rows = np.arange(self._size, self._size + len(ids))
+        self._vectors[rows] = vectors
+        self._ids[rows] = ids
+        self._alive[rows] = True
+        self._size += len(ids)
+        self._row_of.update(zip(ids.tolist(), rows.tolist()))
+
+        assignment = _assign(vectors, self.centroids)
+        order = np.argsort(assignment, kind="stable")
+        lists, starts = np.unique(assignment[order], return_index=True)
+        for list_id, group in zip(lists, np.split(rows[order], starts[1:])):
+            self._lists[list_id] = np.concatenate((self._lists[list_id], group))
+
+    def delete(self, ids) -> None:
+        """Removes the given ids; unknown ids are ignored."""
+        for i in ids:
+            row = self._row_of.pop(int(i), None)
+            if row is not None:
+                self._alive[row] = False
+                self._dead += 1
+        if self._dead > COMPACT_DEAD_FRACTION * max(self._size, 1):
+            self._compact()
+
+    def _compact(self) -> None:
+        """Drops deleted rows from the inverted lists (their storage is reused on the next growth)."""
+        self._lists = [rows[self._alive[rows]] for rows in self._lists]
+        keep = np.flatnonzero(self._alive[:self._size])
+        remap = np.full(self._size, -1, dtype=np.intp)
+        remap[keep] = np.arange(len(keep))
+        self._vectors[:len(keep)] = self._vectors[keep]
+        self._ids[:len(keep)] = self._ids[keep]
+        self._alive[:len(keep)] = True
+        self._alive[len(keep):self._size] = False
+        self._size = len(keep)
+        self._lists = [remap[rows] for rows in self._lists]
+        self._row_of = dict(zip(self._ids[:self._size].tolist(), range(self._size)))
+        self._dead = 0
+
+    def search(self, query, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Returns (ids, cosine scores) of up to k approximate nearest neighbours, best first."""
+        query = agent_index.l2_normalize(np.asarray(query, dtype=np.float32))
+        centroid_scores = self.centroids @ query
+        probe = np.argpartition(-centroid_scores, self.n_probe - 1)[:self.n_probe]
+        rows = np.concatenate([self._lists[i] for i in probe])
+        rows = rows[self._alive[rows]]
+        if not len(rows):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        scores = self._vectors[rows] @ query
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return self._ids[rows[top]], scores[top]
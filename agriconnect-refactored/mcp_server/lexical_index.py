@@ -0,0 +1,102 @@
+# mcp_server/lexical_index.py
+
+import math
+import re
+from collections import Counter
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do for from has have i in is it me my of on or our please the "
+    "their them then there this to up we what when where which who will with you your".split()
+)
+
+# Repeat counts per card field: tags and names say more about an agent than its prose
+FIELD_WEIGHTS = {"tags": 3, "name": 2, "examples": 1, "description": 1}
+
+
+def _stem(token: str) -> str:
+    """Tiny plural folding, enough for 'buyers' -> 'buyer' and 'deliveries' -> 'delivery'."""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> list[str]:
+    return [_stem(t) for t in _TOKEN_RE.findall(text.casefold()) if t not in STOPWORDS]
+
+
+def card_fields(card: dict) -> dict[str, list[str]]:
+    """The searchable text of an agent card, grouped by FIELD_WEIGHTS field."""
+    skills = card.get("skills", [])
+    return {
+        "tags": [tag for s in skills for tag in s.get("tags", [])],
+        "name": [card.get("name", "").replace("_", " ")] + [s.get("name", "") for s in skills],
+        "examples": [ex for s in skills for ex in s.get("examples", [])],
+        "description": [card.get("description", "")] + [s.get("description", "") for s in skills],
+    }
+
+
+class LexicalIndex:
+    """
+    In-memory BM25 index over agent card tags, names, skills and examples.
+    Scoring a query is a few dict lookups per term, so obvious requests
+    ("price of onion", "find buyers") can be routed without an embedding call.
+    """
+
+    def __init__(self, cards: list[dict], k1: float = 1.5, b: float = 0.75):
+        self.k1, self.b = k1, b
+        self.n_docs = len(cards)
+        # term -> [(card position, term frequency)]
+        self.postings: dict[str, list[tuple[int, int]]] = {}
+        lengths = []
+        # The distinct terms of each card, for query coverage
+        self.card_terms: list[frozenset[str]] = []
+        for i, card in enumerate(cards):
+            terms = Counter()
+            for field, texts in card_fields(card).items():
+                for text in texts:
+                    for token in tokenize(text):
+                        terms[token] += FIELD_WEIGHTS[field]
+            lengths.append(sum(terms.values()))
+            self.card_terms.append(frozenset(terms))
+            for term, tf in terms.items():
+                self.postings.setdefault(term, []).append((i, tf))
+        self.doc_lengths = np.asarray(lengths, dtype=np.float32)
+        self.avg_length = float(self.doc_lengths.mean()) if lengths else 0.0
+        self.idf = {
+            term: math.log(1 + (self.n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every card for the query (0 where no term matches)."""
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        if not self.n_docs:
+            return scores
+        for term in set(tokenize(query)):
+            for i, tf in self.postings.get(term, ()):
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[i] / self.avg_length)
+                scores[i] += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def coverage(self, query: str, position: int) -> float:
+        """Share of the query's distinct terms that the card at `position` contains."""
+        terms = set(tokenize(query))
+        if not terms:
+            return 0.0
+        return len(terms & self.card_terms[position]) / len(terms)
+
+    @staticmethod
+    def is_confident(scores: np.ndarray, min_score: float, margin: float) -> bool:
+        """True when one card clearly wins: it scores at least min_score and margin x the runner-up."""
+        if scores.size == 0:
+            return False
+        top_two = np.sort(scores)[-2:]
+        best = float(top_two[-1])
+        runner_up = float(top_two[0]) if scores.size > 1 else 0.0
+        return best >= min_score and best >= margin * runner_up
@@ -0,0 +1,84 @@
+# mcp_server/micro_batcher.py
+
+import asyncio
+import logging
+from concurrent.futures import Executor
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatcher:
+    """
+    Collects texts to embed for up to `window` seconds (or until `max_batch`
+    are waiting) and embeds them with one batched call, handing each waiter
+    its own vector. Under bursty load this turns N embedding requests into
+    one, while a lone query waits at most `window` extra.
+    """
+
+    def __init__(
+        self,
+        embed_batch: Callable[[list[str]], list],
+        executor: Executor,
+        window: float,
+        max_batch: int,
+    ):
+        self.embed_batch = embed_batch
+        self.executor = executor
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: dict[str, list[asyncio.Future]] = {}
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self.queries = 0
+        self.batches = 0
+        self.max_batch_seen = 0
+
+    async def embed(self, text: str):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # Identical texts in the same window share one slot in the batch
+        self._pending.setdefault(text, []).append(future)
+        self.queries += 1
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        self.batches += 1
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+        asyncio.get_running_loop().create_task(self._run_batch(batch))
+
+    async def _run_batch(self, batch: dict[str, list[asyncio.Future]]) -> None:
+        texts = list(batch)
+        try:
+            vectors = await asyncio.get_running_loop().run_in_executor(self.executor, self.embed_batch, texts)
+            if len(vectors) != len(texts):
+                raise ValueError(f"Expected {len(texts)} embeddings, got {len(vectors)}")
+        except Exception as e:
+            logger.error(f"Batched embedding of {len(texts)} queries failed: {e!r}")
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():  # The waiter may have timed out already
+                        future.set_exception(e)
+            return
+        for text, vector in zip(texts, vectors):
+            for future in batch[text]:
+                if not future.done():
+                    future.set_result(vector)
+
+    def stats(self) -> dict:
+        return {
+            "queries": self.queries,
+            "batches": self.batches,
+            "avg_batch_size": round(self.queries / self.batches, 2) if self.batches else None,
+            "max_batch_size": self.max_batch_seen,
+            "window_ms": self.window * 1000,
+        }
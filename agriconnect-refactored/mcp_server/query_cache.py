@@ -0,0 +1,113 @@
+# mcp_server/query_cache.py
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from common.text import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU cache of query embeddings with a TTL, keyed by embedding model
+    and normalized query text. The orchestrator sends the same task
+    descriptions over and over, so repeat intents skip the embedding call.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # (model, normalized text) -> (vector, stored_at wall-clock time)
+        self._entries: OrderedDict[tuple[str, str], tuple[np.ndarray, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, query: str, model: str) -> np.ndarray | None:
+        key = (model, normalize_text(query))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, query: str, model: str, vector) -> None:
+        key = (model, normalize_text(query))
+        with self._lock:
+            self._store(key, np.asarray(vector, dtype=np.float32), time.time())
+
+    def _store(self, key: tuple[str, str], vector: np.ndarray, stored_at: float) -> None:
+        self._entries[key] = (vector, stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def save(self, path: str | Path) -> None:
+        """Writes the live entries to an .npz file (atomically) so a restart starts warm."""
+        path = Path(path)
+        now = time.time()
+        with self._lock:
+            entries = [(key, entry) for key, entry in self._entries.items() if now - entry[1] < self.ttl]
+        if not entries:
+            return
+        # Vectors of different models may differ in size, so store them one array per entry
+        arrays = {
+            "models": np.array([key[0] for key, _ in entries]),
+            "texts": np.array([key[1] for key, _ in entries]),
+            "stored_at": np.array([entry[1] for _, entry in entries]),
+        }
+        for i, (_, entry) in enumerate(entries):
+            arrays[f"v{i}"] = entry[0]
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with tmp_path.open("wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, path)
+            logger.info(f"Saved {len(entries)} query embeddings to {path}")
+        except OSError:
+            logger.warning(f"Could not save query embedding cache to {path}", exc_info=True)
+
+    def load(self, path: str | Path) -> None:
+        """Loads entries saved by save(), skipping ones that have expired since."""
+        path = Path(path)
+        if not path.is_file():
+            return
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                now = time.time()
+                loaded = 0
+                with self._lock:
+                    # Oldest first, so the LRU order survives the round trip
+                    for i, (model, text, stored_at) in enumerate(zip(data["models"], data["texts"], data["stored_at"])):
+                        if now - stored_at < self.ttl:
+                            self._store((str(model), str(text)), data[f"v{i}"], float(stored_at))
+                            loaded += 1
+            logger.info(f"Loaded {loaded} query embeddings from {path}")
+        except (OSError, ValueError, KeyError):
+            logger.warning(f"Ignoring unreadable query embedding cache at {path}", exc_info=True)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
@@ -1,9 +1,13 @@
 # mcp_server/server.py
 
+import asyncio
+import hashlib
 import json
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import logging
-import google.generativeai as genai
+import time
 import numpy as np
 import pandas as pd
 
@@ -11,24 +15,103 @@ from mcp.server.fastmcp import FastMCP
 from mcp.server.fastmcp.utilities.logging import get_logger
 
 from common.settings import settings
+from .agent_index import AgentIndex
+from .card_watcher import CardDirectoryWatcher
+from .embedding_cache import EmbeddingCache
+from .embedding_providers import get_embedding_provider
+from .embedding_retries import EmbeddingRetries
+from .micro_batcher import EmbeddingBatcher
+from .query_cache import QueryEmbeddingCache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 AGENT_CARDS_DIR = Path(__file__).parent.parent / "agent_cards"
 
-def init_api_key():
-    if not settings.GOOGLE_API_KEY:
-        raise ValueError("GOOGLE_API_KEY is not set")
-    genai.configure(api_key=settings.GOOGLE_API_KEY)
+# Google embeddings or the offline hashed n-gram backend, per MCP_EMBEDDING_PROVIDER
+embedding_provider = get_embedding_provider()
+
+# Repeat routing queries skip the embedding round trip
+query_embedding_cache = QueryEmbeddingCache(settings.MCP_QUERY_CACHE_SIZE, settings.MCP_QUERY_CACHE_TTL)
+
+# The embedding client is blocking, so query embeddings run on a bounded pool
+# of threads and never stall the event loop that serves every SSE session.
+embedding_executor = ThreadPoolExecutor(max_workers=settings.MCP_EMBEDDING_WORKERS, thread_name_prefix="embed")
+
+def embed_queries(queries: list[str]) -> list:
+    return embedding_provider.embed_queries(queries)
+
+# Concurrent query embeddings arriving within a few milliseconds share one API call
+query_embedding_batcher = (
+    EmbeddingBatcher(
+        embed_queries,
+        embedding_executor,
+        window=settings.MCP_QUERY_BATCH_WINDOW_MS / 1000,
+        max_batch=settings.MCP_QUERY_BATCH_MAX,
+    )
+    if settings.MCP_QUERY_BATCH_WINDOW_MS > 0 else None
+)
+
+# The routing index, built in serve()
+agent_index: AgentIndex | None = None
+# How queries were routed: lexical, hybrid, vector or lexical_fallback
+route_counts: Counter = Counter()
+# Hot reloads of the index after agent card files changed; cards_version lets clients drop cached routes.
+# missing_texts counts card texts that could not be embedded; the card watcher retries them when due.
+index_info = {"reloads": 0, "last_reload_s": None, "cards_version": None, "missing_texts": 0}
+# When those card texts may be sent to the embedding API again
+embedding_retries = EmbeddingRetries(
+    base_delay=max(settings.MCP_CARDS_RELOAD_INTERVAL, 1.0),
+    max_delay=settings.MCP_EMBEDDING_TEXT_RETRY_MAX_DELAY,
+    max_failures=settings.MCP_EMBEDDING_TEXT_MAX_FAILURES,
+)
+
+def generate_embeddings_batch(texts: list[str], attempts: int | None = None) -> list:
+    """
+    Embeds several texts in a single API call, retrying with exponential
+    backoff (MCP_EMBEDDING_MAX_RETRIES attempts unless `attempts` is given).
+    Raises the last error if every attempt fails.
+    """
+    attempts = attempts or settings.MCP_EMBEDDING_MAX_RETRIES
+    for attempt in range(1, attempts + 1):
+        try:
+            embeddings = embedding_provider.embed_documents(texts)
+            if len(embeddings) != len(texts):
+                raise ValueError(f"Expected {len(texts)} embeddings, got {len(embeddings)}")
+            return embeddings
+        except Exception as e:
+            if attempt == attempts:
+                raise
+            delay = settings.MCP_EMBEDDING_RETRY_BACKOFF * 2 ** (attempt - 1)
+            logger.warning(f"Embedding batch of {len(texts)} failed (attempt {attempt}): {e}. Retrying in {delay}s.")
+            time.sleep(delay)
 
 def generate_embeddings(text: str) -> list:
+    """Embeds one text with a single attempt; returns [] if it fails."""
     try:
-        return genai.embed_content(model=settings.GOOGLE_EMBEDDING_MODEL, content=text, task_type="retrieval_document")["embedding"]
-    except Exception:
-        logger.error(f"Failed to generate embeddings: {text[:100]}...", exc_info=True)
+        return generate_embeddings_batch([text], attempts=1)[0]
+    except Exception as e:
+        logger.warning(f"Failed to embed card text '{text[:100]}': {e!r}")
         return []
 
+async def embed_query(query: str):
+    """
+    Returns the query's embedding, from the query cache when this intent was
+    seen recently. Raises TimeoutError after MCP_EMBEDDING_TIMEOUT seconds.
+    """
+    model = embedding_provider.name
+    query_embedding = query_embedding_cache.get(query, model)
+    if query_embedding is None:
+        if query_embedding_batcher is not None:
+            pending = query_embedding_batcher.embed(query)
+        else:
+            call = lambda: embedding_provider.embed_queries([query])[0]
+            pending = asyncio.get_running_loop().run_in_executor(embedding_executor, call)
+        # On timeout the worker thread finishes in the background; the caller is released
+        query_embedding = await asyncio.wait_for(pending, timeout=settings.MCP_EMBEDDING_TIMEOUT)
+        query_embedding_cache.put(query, model, query_embedding)
+    return query_embedding
+
 def load_agent_cards() -> list:
     """
     Loads agent card data and crucially sets the URL to point to the GATEWAY.
@@ -54,40 +137,327 @@ def load_agent_cards() -> list:
             agent_cards_data.append(data)
     return agent_cards_data
 
-def build_agent_card_embeddings() -> pd.DataFrame | None:
+def embed_card_texts(texts: list[str], cache: EmbeddingCache | None, known: dict | None = None) -> list:
+    """
+    Returns one embedding per text, [] where it could not be generated.
+    Vectors come from `known` (text -> vector, e.g. the live index) or the
+    on-disk cache where possible; the rest are embedded
+    in batches of MCP_EMBEDDING_BATCH_SIZE. If a batch still fails after its
+    retries, a single text is tried alone (one embedded before if there is
+    one, else the batch's first): if that fails too the API is taken to be
+    down and no further calls are made (the missing texts are retried later
+    by the card watcher); otherwise the batch held a bad text, and its texts
+    are embedded one by one so it cannot take the rest down.
+    Texts that failed before are only sent again once embedding_retries
+    says they are due.
+    """
+    model = embedding_provider.name
+    embeddings = [[] for _ in texts]
+    pending = []
+    known = known or {}
+    for i, text in enumerate(texts):
+        cached = known.get(text)
+        if cached is None and cache is not None:
+            cached = cache.get(text, model)
+        if cached is not None:
+            embeddings[i] = cached
+        elif embedding_retries.is_due(text):
+            pending.append(i)
+
+    batch_size = settings.MCP_EMBEDDING_BATCH_SIZE
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        try:
+            vectors = generate_embeddings_batch([texts[i] for i in batch])
+        except Exception as e:
+            # Probe with a text that was embedded before where possible, so a bad text cannot pass for an outage
+            probe_text = next((t for t, v in zip(texts, embeddings) if len(v) > 0), None) or next(iter(known), None)
+            if probe_text is None and len(batch) > 1:
+                probe_text = texts[batch[0]]
+            probe = generate_embeddings(probe_text) if probe_text is not None else []
+            if len(probe) == 0:
+                embedding_retries.api_down()
+                logger.error(
+                    f"Embedding API unavailable ({e!r}); {len(pending) - start} card text(s) left unembedded, "
+                    f"retrying in {embedding_retries.stats()['api_retry_in_s']}s."
+                )
+                break
+            logger.error(f"Embedding batch of {len(batch)} card texts failed ({e!r}); embedding them individually.")
+            vectors = [probe if texts[i] == probe_text else generate_embeddings(texts[i]) for i in batch]
+        embedding_retries.api_up()
+        for i, vector in zip(batch, vectors):
+            embeddings[i] = vector
+            if len(vector) == 0:
+                embedding_retries.text_failed(texts[i])
+                continue
+            embedding_retries.succeeded(texts[i])
+            if cache is not None:
+                cache.put(texts[i], model, vector)
+    return embeddings
+
+def card_embedding_texts(card: dict) -> list[str]:
+    """
+    The texts embedded for a card: a whole-card summary and, in multi-vector
+    mode, each skill description and example utterance on its own, so a
+    specific phrasing is not diluted by the rest of the card.
+    """
+    skills = card.get('skills', [])
+    summary = f"Name: {card.get('name')}. Description: {card.get('description')}. Skills: {' '.join([s.get('description', '') for s in skills])}"
+    if not settings.MCP_MULTI_VECTOR:
+        return [summary]
+    texts = [summary] + [s.get('description', '') for s in skills] + [ex for s in skills for ex in s.get('examples', [])]
+    return list(dict.fromkeys(t for t in texts if t.strip()))
+
+def build_agent_card_embeddings(known: dict | None = None, previous_cards: dict | None = None) -> pd.DataFrame | None:
+    """
+    Loads the agent cards and embeds their texts, reusing `known` vectors
+    (text -> vector). A card whose new texts could not all be embedded keeps
+    its vectors from `previous_cards` (name -> (texts, vectors)) if it had
+    any, so an edit during an embedding outage does not make it unroutable;
+    the missing texts are retried later.
+    """
     agent_cards = load_agent_cards()
     if not agent_cards: return None
     logger.info("Generating embeddings for agent cards...")
+    cache = EmbeddingCache(settings.MCP_EMBEDDING_CACHE_DIR) if settings.MCP_EMBEDDING_CACHE_DIR else None
     df = pd.DataFrame({'agent_card': agent_cards})
-    df['text_for_embedding'] = df['agent_card'].apply(lambda card: f"Name: {card.get('name')}. Description: {card.get('description')}. Skills: {' '.join([s.get('description', '') for s in card.get('skills', [])])}")
-    df['card_embeddings'] = df['text_for_embedding'].apply(generate_embeddings)
-    df = df[df['card_embeddings'].str.len() > 0].reset_index(drop=True)
+    df['texts_for_embedding'] = df['agent_card'].apply(card_embedding_texts)
+    # Embed every text of every card together so they share batches
+    flat_texts = [t for texts in df['texts_for_embedding'] for t in texts]
+    flat_vectors = embed_card_texts(flat_texts, cache, known)
+    embedding_retries.set_missing(t for t, v in zip(flat_texts, flat_vectors) if len(v) == 0)
+    flat_embeddings = iter(flat_vectors)
+    pairs = [
+        [(t, v) for t, v in ((t, next(flat_embeddings)) for t in texts) if len(v) > 0]
+        for texts in df['texts_for_embedding']
+    ]
+    missing = sum(len(texts) - len(card_pairs) for texts, card_pairs in zip(df['texts_for_embedding'], pairs))
+    index_info["missing_texts"] = missing
+    if missing:
+        logger.warning(f"{missing} agent card text(s) could not be embedded; their cards route on the remaining vectors.")
+    previous_cards = previous_cards or {}
+    for i, (card, texts) in enumerate(zip(df['agent_card'], df['texts_for_embedding'])):
+        previous_card = previous_cards.get(card.get('name'))
+        if len(pairs[i]) < len(texts) and previous_card is not None:
+            logger.warning(f"Agent card '{card.get('name')}' keeps its previous vectors until its new texts are embedded.")
+            pairs[i] = list(zip(*previous_card))
+    df['embedded_texts'] = [[t for t, _ in card_pairs] for card_pairs in pairs]
+    df['card_embeddings'] = [[v for _, v in card_pairs] for card_pairs in pairs]
+    failed = df['card_embeddings'].apply(len) == 0
+    if failed.any():
+        failed_names = [card.get('name') for card in df.loc[failed, 'agent_card']]
+        logger.error(f"No embedding for {len(failed_names)} agent card(s), they route lexically until embedded: {failed_names}")
+    if cache is not None:
+        logger.info(f"Embedding cache at {cache.cache_dir}: {cache.stats()}")
     logger.info("Done generating embeddings.")
     return df
 
-def serve(host, port, transport):
-    """Initializes and runs the dedicated AgriConnect MCP server."""
-    init_api_key()
-    mcp = FastMCP("agriconnect-mcp", host=host, port=port)
-    df_agents = build_agent_card_embeddings()
+def build_agent_index(previous: AgentIndex | None = None) -> AgentIndex | None:
+    """Builds the routing index, reusing the vectors of `previous` for texts that did not change."""
+    known = previous.vectors_by_text() if previous is not None else None
+    previous_cards = previous.vectors_by_card() if previous is not None else None
+    df = build_agent_card_embeddings(known, previous_cards)
+    if df is None or df.empty:
+        return None
+    embeddings = [v for vectors in df['card_embeddings'] for v in vectors]
+    owners = [i for i, vectors in enumerate(df['card_embeddings']) for _ in vectors]
+    texts = [t for card_texts in df['embedded_texts'] for t in card_texts]
+    return AgentIndex(
+        df['agent_card'].tolist(),
+        np.stack(embeddings) if embeddings else np.empty((0, 0), dtype=np.float32),
+        owners,
+        top_m=settings.MCP_MULTI_VECTOR_TOP_M,
+        texts=texts,
+        ann_min_vectors=settings.MCP_ANN_MIN_VECTORS,
+        ann_probes=settings.MCP_ANN_PROBES,
+        ann_candidates=settings.MCP_ANN_CANDIDATES,
+        ann_previous=previous,
+    )
 
-    @mcp.tool(name="find_agent", description="Finds the most relevant agent for a given task.")
-    def find_agent(query: str) -> str:
-        if df_agents is None or df_agents.empty:
-            logger.error("Agent card DataFrame is not available.")
-            return json.dumps({"error": "No agents available."})
-            
+def cards_version(index: AgentIndex | None) -> str | None:
+    """Short fingerprint of the indexed agent cards; it changes whenever any card does."""
+    if index is None:
+        return None
+    return hashlib.sha256(json.dumps(index.cards, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+def reload_agent_index(added: list[str], changed: list[str], removed: list[str]) -> None:
+    """
+    Rebuilds the index after agent card files changed, embedding only texts
+    that are new, and swaps it in with a single reference assignment: each
+    request works on whichever complete index it picked up when it started.
+    """
+    global agent_index
+    if added or changed or removed:
+        logger.info(f"Agent cards changed (added {added}, changed {changed}, removed {removed}); rebuilding the index.")
+        # An edited card's texts get a fresh set of embedding attempts
+        for file_name in added + changed:
+            try:
+                card = json.loads((AGENT_CARDS_DIR / file_name).read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                continue
+            embedding_retries.forget(card_embedding_texts(card))
+    else:
+        logger.info(f"Retrying {index_info['missing_texts']} agent card text(s) that could not be embedded.")
+    started = time.perf_counter()
+    new_index = build_agent_index(previous=agent_index)
+    agent_index = new_index
+    index_info["cards_version"] = cards_version(new_index)
+    index_info["reloads"] += 1
+    index_info["last_reload_s"] = round(time.perf_counter() - started, 3)
+    logger.info(f"Agent index swapped in {index_info['last_reload_s']}s: {len(new_index) if new_index else 0} agents.")
+
+def lexical_winner(index: AgentIndex, query: str, lexical: np.ndarray) -> bool:
+    """
+    True when BM25 alone can be trusted: the best card clearly beats the
+    runner-up and contains most of the query's terms, so a query that shares
+    one word with a card ("price of a cricket bat") is not a confident match.
+    """
+    if not lexical.size or lexical.max() <= 0:
+        return False
+    return (
+        index.lexical.is_confident(lexical, settings.MCP_LEXICAL_MIN_SCORE, settings.MCP_LEXICAL_MARGIN)
+        and index.lexical.coverage(query, int(lexical.argmax())) >= settings.MCP_LEXICAL_MIN_COVERAGE
+    )
+
+async def rank_agents(index: AgentIndex, query: str, k: int) -> tuple[list[tuple[dict, float, float]], str]:
+    """
+    Ranks the agents for a query and says how it was routed:
+    - lexical: BM25 over the cards has one clear winner, no embedding call is made
+      (scores are BM25 relative to the best card, so the winner scores 1.0);
+    - hybrid: cosine similarity blended with the relative BM25 score;
+    - vector: no query term matched any card, cosine similarity only;
+    - lexical_fallback: the embedding call failed (or no card is embedded yet), BM25 keeps routing alive.
+    Returns (card, ranking score, confidence) triples. The ranking score is
+    not comparable across routes; the confidence is the cosine similarity
+    when the query was embedded, else 1.0 for a confident BM25 winner and 0.0
+    for every other card.
+    """
+    lexical = index.lexical.scores(query) if settings.MCP_LEXICAL_ROUTING else np.zeros(len(index), dtype=np.float32)
+    best_lexical = float(lexical.max()) if lexical.size else 0.0
+    confident = lexical_winner(index, query, lexical)
+    if confident:
+        route = "lexical"
+        scores, similarity = lexical / best_lexical, None
+    else:
         try:
-            query_embedding = genai.embed_content(model=settings.GOOGLE_EMBEDDING_MODEL, content=query, task_type="retrieval_query")["embedding"]
-            dot_products = np.dot(np.stack(df_agents['card_embeddings']), query_embedding)
-            best_match_index = np.argmax(dot_products)
-            best_agent_card = df_agents.iloc[best_match_index]['agent_card']
-            logger.info(f"MCP found best match: '{best_agent_card.get('name')}', returning card with gateway URL: {best_agent_card.get('url')}")
-            return json.dumps(best_agent_card)
+            if not len(index.matrix):
+                raise LookupError("no agent card is embedded yet")
+            similarity = index.scores(await embed_query(query))
         except Exception as e:
-            logger.error(f"Error during agent finding: {e}", exc_info=True)
-            return json.dumps({"error": f"Failed to find agent due to an internal error: {e}"})
+            if best_lexical <= 0:
+                raise
+            logger.warning(f"Query embedding failed ({e!r}); routing '{query[:70]}' lexically.")
+            route = "lexical_fallback"
+            scores, similarity = lexical / best_lexical, None
+        else:
+            if best_lexical > 0:
+                weight = settings.MCP_HYBRID_LEXICAL_WEIGHT
+                route = "hybrid"
+                scores = (1 - weight) * similarity + weight * lexical / best_lexical
+            else:
+                route = "vector"
+                scores = similarity
+    if similarity is None:
+        similarity = np.zeros(len(index), dtype=np.float32)
+        if confident:
+            similarity[int(lexical.argmax())] = 1.0
+    route_counts[route] += 1
+    ranked = [(index.cards[i], score, float(similarity[i])) for i, score in index.top(scores, k)]
+    return ranked, route
+
+async def find_agent(query: str) -> str:
+    index = agent_index  # The index may be swapped by a reload; stick to one for this query
+    if index is None:
+        logger.error("Agent card index is not available.")
+        return json.dumps({"error": "No agents available."})
+        
+    try:
+        ranked, route = await rank_agents(index, query, k=1)
+        best_agent_card, score, _ = ranked[0]
+        logger.info(f"MCP found best match ({route}): '{best_agent_card.get('name')}' (score {score:.3f}), returning card with gateway URL: {best_agent_card.get('url')}")
+        return json.dumps(best_agent_card)
+    except Exception as e:
+        logger.error(f"Error during agent finding: {e!r}", exc_info=True)
+        return json.dumps({"error": f"Failed to find agent due to an internal error: {e!r}"})
+
+async def find_agents(query: str, k: int = 3, min_score: float = settings.MCP_MIN_MATCH_SCORE) -> str:
+    index = agent_index
+    if index is None:
+        logger.error("Agent card index is not available.")
+        return json.dumps({"error": "No agents available."})
+
+    try:
+        ranked, route = await rank_agents(index, query, k=max(k, 1))
+        # min_score applies to the calibrated confidence; the blended ranking score only orders the matches
+        matches = [
+            {"score": round(score, 4), "confidence": round(confidence, 4), "agent_card": card}
+            for card, score, confidence in ranked if confidence >= min_score
+        ]
+        if not matches:
+            best_confidence = max((confidence for _, _, confidence in ranked), default=None)
+            logger.info(f"MCP found no confident match for '{query[:70]}' (best confidence {best_confidence}, min_score {min_score})")
+            return json.dumps({"no_confident_match": True, "best_confidence": best_confidence, "route": route, "matches": []})
+        logger.info(f"MCP ranked {len(matches)} agents ({route}) for '{query[:70]}': {[(m['agent_card'].get('name'), m['score']) for m in matches]}")
+        return json.dumps({"no_confident_match": False, "route": route, "matches": matches})
+    except Exception as e:
+        logger.error(f"Error during agent ranking: {e!r}", exc_info=True)
+        return json.dumps({"error": f"Failed to rank agents due to an internal error: {e!r}"})
 
+def router_stats() -> str:
+    index = agent_index
+    stats = {
+        "agent_index": {
+            "agents": len(index) if index else 0,
+            "vectors": len(index.matrix) if index else 0,
+            "ann": index is not None and index.ann is not None,
+            **index_info,
+            "embedding_retries": embedding_retries.stats(),
+        },
+        "routes": dict(route_counts),
+        "query_embedding_cache": query_embedding_cache.stats(),
+    }
+    if query_embedding_batcher is not None:
+        stats["query_embedding_batcher"] = query_embedding_batcher.stats()
+    return json.dumps(stats)
+
+def serve(host, port, transport):
+    """Initializes and runs the dedicated AgriConnect MCP server."""
+    global agent_index
+    embedding_provider.configure()
+    logger.info(f"Using embedding provider: {embedding_provider.name}")
+    mcp = FastMCP("agriconnect-mcp", host=host, port=port)
+    agent_index = build_agent_index()
+    index_info["cards_version"] = cards_version(agent_index)
+    if settings.MCP_QUERY_CACHE_FILE:
+        query_embedding_cache.load(settings.MCP_QUERY_CACHE_FILE)
+    card_watcher = None
+    if settings.MCP_CARDS_RELOAD_INTERVAL > 0 and AGENT_CARDS_DIR.is_dir():
+        card_watcher = CardDirectoryWatcher(
+            AGENT_CARDS_DIR,
+            settings.MCP_CARDS_RELOAD_INTERVAL,
+            reload_agent_index,
+            needs_retry=embedding_retries.retry_due,
+        )
+        card_watcher.start()
+
+    mcp.tool(name="find_agent", description="Finds the most relevant agent for a given task.")(find_agent)
+    mcp.tool(
+        name="find_agents",
+        description=(
+            "Ranks the agents most relevant to a task. Returns up to k agent cards with a ranking score and a "
+            "confidence (cosine similarity to the task); if no confidence reaches min_score, returns "
+            "no_confident_match=true and no cards."
+        ),
+    )(find_agents)
+    mcp.tool(name="router_stats", description="Returns routing cache statistics of the MCP server.")(router_stats)
 
     logger.info(f"AgriConnect MCP Server running at http://{host}:{port} with transport {transport}")
-    mcp.run(transport=transport)
\ No newline at end of file
+    try:
+        mcp.run(transport=transport)
+    finally:
+        if card_watcher is not None:
+            card_watcher.stop()
+        logger.info(f"Query embedding cache: {query_embedding_cache.stats()}")
+        if settings.MCP_QUERY_CACHE_FILE:
+            query_embedding_cache.save(settings.MCP_QUERY_CACHE_FILE)
+        embedding_executor.shutdown(wait=False, cancel_futures=True)
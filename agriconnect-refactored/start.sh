@@ -19,15 +19,20 @@ GATEWAY_PORT=9000
 echo "Starting Gateway Server on 0.0.0.0:${GATEWAY_PORT}..."
 python -m gateway_server --host 0.0.0.0 --port ${GATEWAY_PORT} &
 
-# Agent Servers will listen on their fixed internal ports.
-echo "Starting Price Prediction Agent on 0.0.0.0:10001..."
-python -m agents.price_prediction_agent --host 0.0.0.0 --port 10001 &
-
-echo "Starting Buyer Matching Agent on 0.0.0.0:10002..."
-python -m agents.buyer_matching_agent --host 0.0.0.0 --port 10002 &
-
-echo "Starting Trade Coordination Agent on 0.0.0.0:10003..."
-python -m agents.trade_coordination_agent --host 0.0.0.0 --port 10003 &
+# With GATEWAY_INPROCESS_AGENTS=true the gateway hosts the agents itself (single-container mode).
+if [ "${GATEWAY_INPROCESS_AGENTS,,}" = "true" ]; then
+    echo "Agents are hosted in-process by the Gateway Server."
+else
+    # Agent Servers will listen on their fixed internal ports.
+    echo "Starting Price Prediction Agent on 0.0.0.0:10001..."
+    python -m agents.price_prediction_agent --host 0.0.0.0 --port 10001 &
+
+    echo "Starting Buyer Matching Agent on 0.0.0.0:10002..."
+    python -m agents.buyer_matching_agent --host 0.0.0.0 --port 10002 &
+
+    echo "Starting Trade Coordination Agent on 0.0.0.0:10003..."
+    python -m agents.trade_coordination_agent --host 0.0.0.0 --port 10003 &
+fi
 
 echo "--- All services started. ---"
 
@@ -0,0 +1,38 @@
+# tests/conftest.py
+
+import importlib.util
+import os
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+# Required by common.settings; the tests never contact these services
+for name, value in {
+    "GOOGLE_API_KEY": "test",
+    "GOOGLE_CLOUD_PROJECT": "test",
+    "GOOGLE_CLOUD_LOCATION": "test",
+    "BUYER_DATASTORE_ID": "test",
+    "BUYER_DATASTORE_REGION": "test",
+    "PRICE_DATASTORE_ID": "test",
+    "PRICE_DATASTORE_REGION": "test",
+    "MCP_SERVER_URL": "http://mcp.test/sse",
+    "GATEWAY_SERVER_URL": "http://gateway.test",
+    "PRICE_PREDICTION_AGENT_URL": "http://price.test/",
+    "BUYER_MATCHING_AGENT_URL": "http://buyer.test/",
+    "TRADE_COORDINATION_AGENT_URL": "http://trade.test/",
+}.items():
+    os.environ.setdefault(name, value)
+
+
+def load_module(relative_path: str, name: str):
+    """
+    Imports a single source file without its package's __init__, which pulls
+    in the whole agent runtime. Fake third-party modules must already be in
+    sys.modules.
+    """
+    spec = importlib.util.spec_from_file_location(name, PROJECT_ROOT / relative_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
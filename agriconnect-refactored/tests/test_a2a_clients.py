@@ -0,0 +1,135 @@
+# tests/test_a2a_clients.py
+
+import asyncio
+import sys
+import threading
+import types
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from conftest import load_module
+
+
+@dataclass
+class AgentCard:
+    name: str
+    url: str
+    version: str = "1"
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Installs a fake a2a package; returns the (agent name, httpx client, http_kwargs) of each send."""
+    calls = []
+
+    class A2AClient:
+        def __init__(self, httpx_client, agent_card):
+            self.httpx_client = httpx_client
+            self.agent_card = agent_card
+
+        async def send_message(self, request, http_kwargs=None):
+            calls.append((self.agent_card.name, self.httpx_client, http_kwargs))
+            return request
+
+    a2a_client = types.ModuleType("a2a.client")
+    a2a_client.A2AClient = A2AClient
+    a2a_types = types.ModuleType("a2a.types")
+    a2a_types.AgentCard = AgentCard
+    a2a_types.SendMessageRequest = a2a_types.SendMessageResponse = object
+    monkeypatch.setitem(sys.modules, "a2a", types.ModuleType("a2a"))
+    monkeypatch.setitem(sys.modules, "a2a.client", a2a_client)
+    monkeypatch.setitem(sys.modules, "a2a.types", a2a_types)
+    return calls
+
+
+@pytest.fixture
+def a2a_clients(sent):
+    return load_module("agents/agriconnect_orchestrator/a2a_clients.py", "a2a_clients")
+
+
+def test_clients_are_reused_per_card_url(sent, a2a_clients):
+    price = AgentCard("price", "http://gateway.test/invoke/?agent_name=price")
+    buyer = AgentCard("buyer", "http://gateway.test/invoke/?agent_name=buyer")
+
+    async def scenario():
+        registry = a2a_clients.A2AClientRegistry(300.0, {})
+        for _ in range(3):
+            await registry.send_message(price, "request")
+            await registry.send_message(buyer, "request")
+        # A changed card behind the same URL gets a fresh client
+        await registry.send_message(AgentCard(price.name, price.url, version="2"), "request")
+        await registry.aclose()
+        return registry.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["clients_created"] == 3
+    assert stats["clients_reused"] == 4
+    assert len({id(http_client) for _, http_client, _ in sent}) == 1
+
+
+def test_each_request_carries_its_agents_timeout(sent, a2a_clients):
+    async def scenario():
+        registry = a2a_clients.A2AClientRegistry(300.0, {"price": 60.0})
+        await registry.send_message(AgentCard("price", "http://gateway.test/price"), "request")
+        await registry.send_message(AgentCard("buyer", "http://gateway.test/buyer"), "request")
+        await registry.aclose()
+
+    asyncio.run(scenario())
+    assert [(name, kwargs["timeout"]) for name, _, kwargs in sent] == [("price", 60.0), ("buyer", 300.0)]
+
+
+def test_new_event_loop_gets_a_new_http_client(sent, a2a_clients):
+    registry = a2a_clients.A2AClientRegistry(300.0, {})
+    card = AgentCard("price", "http://gateway.test/price")
+    asyncio.run(registry.send_message(card, "request"))
+    asyncio.run(registry.send_message(card, "request"))
+    asyncio.run(registry.aclose())
+    assert sent[0][1] is not sent[1][1]
+    assert registry.stats()["clients_created"] == 2
+
+
+@pytest.fixture
+def keepalive_server():
+    """A local HTTP/1.1 server that keeps connections open; yields its URL."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("content-length", 0)))
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_loop_change_closes_the_previous_http_client(sent, a2a_clients, keepalive_server):
+    registry = a2a_clients.A2AClientRegistry(300.0, {})
+    card = AgentCard("price", keepalive_server)
+
+    async def post_once():
+        client = await registry.client_for(card)
+        await client.httpx_client.post(card.url, content=b"{}")
+        return client.httpx_client
+
+    old_client = asyncio.run(post_once())
+    old_sockets = a2a_clients._pooled_sockets(old_client)
+    assert len(old_sockets) == 1 and old_sockets[0].fileno() != -1
+
+    # The first loop is closed now; moving to a new one must not leak its connection
+    new_client = asyncio.run(post_once())
+    assert new_client is not old_client
+    assert old_client.is_closed
+    assert old_sockets[0].fileno() == -1
+    asyncio.run(registry.aclose())
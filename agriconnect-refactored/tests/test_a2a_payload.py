@@ -0,0 +1,41 @@
+# tests/test_a2a_payload.py
+
+import json
+
+import pytest
+
+from gateway_server.a2a_payload import rewrite_response_ids
+
+
+def send_payload(**message) -> dict:
+    return {
+        "jsonrpc": "2.0",
+        "id": "caller-1",
+        "method": "message/send",
+        "params": {"message": {"role": "user", "messageId": "m-1", "parts": [], **message}},
+    }
+
+
+@pytest.mark.parametrize("body", [b"[1, 2]", b'"text"', b"42", b"null", b"Bad Gateway", b"\xff\xfe"])
+def test_non_object_bodies_are_returned_unchanged(body):
+    assert rewrite_response_ids(body, send_payload()) == body
+
+
+def test_ids_are_rewritten_for_the_caller():
+    body = json.dumps({
+        "jsonrpc": "2.0",
+        "id": "other-caller",
+        "result": {
+            "kind": "task",
+            "id": "task-1",
+            "contextId": "ctx-other",
+            "status": {"state": "completed"},
+            "history": [{"role": "user", "messageId": "m-other", "taskId": "task-1", "contextId": "ctx-other"}],
+        },
+    }).encode()
+    data = json.loads(rewrite_response_ids(body, send_payload(contextId="ctx-mine")))
+    result = data["result"]
+    assert data["id"] == "caller-1"
+    assert result["id"] != "task-1" and result["history"][0]["taskId"] == result["id"]
+    assert result["contextId"] == result["history"][0]["contextId"] == "ctx-mine"
+    assert result["history"][0]["messageId"] == "m-1"
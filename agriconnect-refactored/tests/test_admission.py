@@ -0,0 +1,70 @@
+# tests/test_admission.py
+
+import asyncio
+
+import httpx
+import pytest
+
+from common.settings import settings
+from gateway_server.admission import AdmissionController, AdmissionRejected, AgentAdmission
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    async def scenario():
+        admission = AgentAdmission("agent", max_concurrency=1, max_queue=1, queue_timeout=5.0)
+        admission.hold_ewma_s = 4.0
+        admitted_at = await admission.acquire()
+        waiter = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+        assert admission.waiting == 1
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire()
+        # One caller waiting plus the newcomer, each holding the only slot ~4 s
+        assert rejected.value.retry_after == 8
+        assert rejected.value.reason == "wait queue is full"
+
+        # The queued caller gets the slot once it is released
+        admission.release(admitted_at)
+        admission.release(await waiter)
+        return admission.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["admitted"], stats["rejected_queue_full"], stats["active"], stats["queue_depth"]) == (2, 1, 0, 0)
+
+
+def test_queue_timeout_is_rejected():
+    async def scenario():
+        admission = AgentAdmission("agent", max_concurrency=1, max_queue=4, queue_timeout=0.05)
+        await admission.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire()
+        assert rejected.value.reason == "no slot within 0.05s"
+        assert rejected.value.retry_after == 1  # No hold time measured yet
+        return admission.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["rejected_timeout"], stats["queue_depth"], stats["active"]) == (1, 0, 1)
+
+
+def test_gateway_sheds_with_429_and_retry_after(monkeypatch):
+    from gateway_server import server
+
+    agent_name = next(iter(server.AGENT_URL_MAP))
+    monkeypatch.setattr(settings, "GATEWAY_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "GATEWAY_MAX_QUEUE", 0)
+    monkeypatch.setattr(settings, "GATEWAY_AGENT_MAX_CONCURRENCY", {})
+    monkeypatch.setattr(settings, "GATEWAY_AGENT_MAX_QUEUE", {})
+    monkeypatch.setattr(server, "admission_controller", AdmissionController([agent_name]))
+
+    async def scenario():
+        admission = server.admission_controller.get(agent_name)
+        admission.hold_ewma_s = 2.5
+        await admission.acquire()  # The only slot is busy
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://gateway.test") as client:
+            return await client.post(f"/invoke/?agent_name={agent_name}", content=b"{}")
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "3"
@@ -0,0 +1,133 @@
+# tests/test_circuit_breaker.py
+
+from types import SimpleNamespace
+
+import pytest
+
+from common.settings import settings
+from gateway_server import circuit_breaker
+from gateway_server.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(circuit_breaker, "time", SimpleNamespace(monotonic=lambda: now.value))
+    for name, value in {
+        "GATEWAY_BREAKER_WINDOW": 10,
+        "GATEWAY_BREAKER_MIN_CALLS": 4,
+        "GATEWAY_BREAKER_FAILURE_RATE": 0.5,
+        "GATEWAY_BREAKER_SLOW_CALL_SECONDS": 10.0,
+        "GATEWAY_BREAKER_SLOW_CALL_RATE": 0.75,
+        "GATEWAY_BREAKER_OPEN_SECONDS": 30.0,
+        "GATEWAY_BREAKER_HALF_OPEN_PROBES": 2,
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+    return now
+
+
+def call(breaker: CircuitBreaker, failed: bool = False, duration: float = 0.1) -> None:
+    probe = breaker.before_call()
+    breaker.record(probe, failed=failed, duration=duration)
+
+
+def open_breaker(breaker: CircuitBreaker) -> None:
+    for failed in (False, False, True, True):
+        call(breaker, failed=failed)
+    assert breaker.state == OPEN
+
+
+def test_stays_closed_until_min_calls(clock):
+    breaker = CircuitBreaker("agent")
+    for _ in range(3):
+        call(breaker, failed=True)
+    assert breaker.state == CLOSED
+    call(breaker, failed=True)
+    assert breaker.state == OPEN
+
+
+def test_closed_open_half_open_closed(clock):
+    breaker = CircuitBreaker("agent")
+    open_breaker(breaker)
+
+    with pytest.raises(CircuitOpen) as rejected:
+        breaker.before_call()
+    assert rejected.value.retry_after == 30
+    clock.value += 20
+    with pytest.raises(CircuitOpen) as rejected:
+        breaker.before_call()
+    assert rejected.value.retry_after == 10
+    assert breaker.rejected == 2
+
+    clock.value += 10
+    first = breaker.before_call()
+    assert first is True and breaker.state == HALF_OPEN
+    breaker.record(first, failed=False, duration=0.1)
+    assert breaker.state == HALF_OPEN
+    call(breaker)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["window_calls"] == 0 and breaker.times_opened == 1
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker("agent")
+    open_breaker(breaker)
+    clock.value += 30
+    call(breaker, failed=True)
+    assert breaker.state == OPEN and breaker.times_opened == 2
+    with pytest.raises(CircuitOpen) as rejected:
+        breaker.before_call()
+    assert rejected.value.retry_after == 30
+
+
+def test_slow_probe_reopens(clock):
+    breaker = CircuitBreaker("agent")
+    open_breaker(breaker)
+    clock.value += 30
+    call(breaker, duration=10.0)
+    assert breaker.state == OPEN
+
+
+def test_half_open_admits_only_the_probe_limit(clock):
+    breaker = CircuitBreaker("agent")
+    open_breaker(breaker)
+    clock.value += 30
+    probes = [breaker.before_call(), breaker.before_call()]
+    with pytest.raises(CircuitOpen) as rejected:
+        breaker.before_call()
+    assert rejected.value.retry_after == 1
+
+    # A probe that never reached the agent frees its slot
+    breaker.abandon(probes.pop())
+    probes.append(breaker.before_call())
+    for probe in probes:
+        breaker.record(probe, failed=False, duration=0.1)
+    assert breaker.state == CLOSED
+
+
+def test_stale_call_does_not_count_as_a_probe(clock):
+    breaker = CircuitBreaker("agent")
+    started_while_closed = breaker.before_call()
+    open_breaker(breaker)
+    clock.value += 30
+    probe = breaker.before_call()
+    breaker.record(started_while_closed, failed=False, duration=0.1)
+    breaker.record(probe, failed=False, duration=0.1)
+    assert breaker.state == HALF_OPEN
+
+
+def test_slow_call_rate_opens(clock):
+    breaker = CircuitBreaker("agent")
+    call(breaker)
+    for _ in range(3):
+        call(breaker, duration=10.0)
+    assert breaker.state == OPEN
+    assert breaker.stats()["state"] == OPEN
+
+
+def test_slow_calls_below_the_rate_stay_closed(clock):
+    breaker = CircuitBreaker("agent")
+    for duration in (0.1, 0.1, 10.0, 10.0):
+        call(breaker, duration=duration)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["slow_call_rate"] == 0.5
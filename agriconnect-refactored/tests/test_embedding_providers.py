@@ -0,0 +1,25 @@
+# tests/test_embedding_providers.py
+
+import numpy as np
+import pytest
+
+from mcp_server.embedding_providers import EmbeddingProvider, HashedNgramEmbeddingProvider
+
+
+def test_incomplete_provider_fails_when_created():
+    class DocumentsOnly(EmbeddingProvider):
+        name = "documents-only"
+
+        def embed_documents(self, texts):
+            return [[1.0] for _ in texts]
+
+    with pytest.raises(TypeError):
+        DocumentsOnly()
+
+
+def test_hashed_ngram_provider_is_deterministic_and_normalized():
+    provider = HashedNgramEmbeddingProvider(dim=64)
+    first, second = provider.embed_documents(["find buyers for onions", "find buyers for onions"])
+    assert first == second
+    assert np.linalg.norm(first) == pytest.approx(1.0, abs=1e-5)
+    assert provider.embed_queries(["find buyers for onions"])[0] == first
@@ -0,0 +1,66 @@
+# tests/test_embedding_retries.py
+
+from mcp_server.embedding_retries import EmbeddingRetries
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_retries(clock, max_failures=3) -> EmbeddingRetries:
+    return EmbeddingRetries(base_delay=10.0, max_delay=25.0, max_failures=max_failures, clock=clock)
+
+
+def test_rejected_text_backs_off_exponentially_up_to_the_cap():
+    clock = FakeClock()
+    retries = make_retries(clock, max_failures=10)
+    delays = []
+    for _ in range(4):
+        retries.text_failed("bad")
+        started = clock.now
+        while not retries.is_due("bad"):
+            clock.now += 1
+        delays.append(clock.now - started)
+    assert delays == [10, 20, 25, 25]
+    assert retries.is_due("other")
+
+
+def test_text_is_given_up_after_max_failures_until_forgotten():
+    clock = FakeClock()
+    retries = make_retries(clock)
+    retries.set_missing(["bad"])
+    for _ in range(3):
+        retries.text_failed("bad")
+    clock.now += 10_000
+    assert not retries.is_due("bad")
+    assert not retries.retry_due()
+    assert retries.stats()["given_up"] == 1
+
+    retries.forget(["bad"])
+    assert retries.is_due("bad") and retries.retry_due()
+
+
+def test_api_outage_delays_every_text_without_counting_failures():
+    clock = FakeClock()
+    retries = make_retries(clock, max_failures=1)
+    retries.set_missing(["a", "b"])
+    for _ in range(5):
+        retries.api_down()
+    assert not retries.retry_due()
+    clock.now += 25
+    assert retries.retry_due()
+
+    retries.api_up()
+    assert retries.is_due("a") and retries.stats()["given_up"] == 0
+
+
+def test_success_clears_the_failure_record():
+    clock = FakeClock()
+    retries = make_retries(clock)
+    retries.text_failed("flaky")
+    retries.succeeded("flaky")
+    assert retries.is_due("flaky")
@@ -0,0 +1,62 @@
+# tests/test_hedging.py
+
+import pytest
+
+from common.settings import settings
+from gateway_server.hedging import MAX_HEDGE_TOKENS, HedgePolicy
+
+
+@pytest.fixture(autouse=True)
+def hedge_settings(monkeypatch):
+    for name, value in {
+        "GATEWAY_HEDGE_PERCENTILE": 0.9,
+        "GATEWAY_HEDGE_DEFAULT_DELAY": 30.0,
+        "GATEWAY_HEDGE_MIN_DELAY": 0.5,
+        "GATEWAY_HEDGE_MIN_SAMPLES": 10,
+        "GATEWAY_HEDGE_BUDGET": 0.25,
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+
+
+def test_default_delay_until_enough_samples():
+    policy = HedgePolicy("agent")
+    for _ in range(9):
+        policy.record_latency(2.0)
+    assert policy.hedge_delay() == 30.0
+
+
+def test_delay_is_the_latency_percentile():
+    policy = HedgePolicy("agent")
+    for seconds in range(20, 0, -1):
+        policy.record_latency(float(seconds))
+    # The 90th percentile of 1..20 s is the 18th smallest sample
+    assert policy.hedge_delay() == 18.0
+
+
+def test_delay_is_never_below_the_minimum():
+    policy = HedgePolicy("agent")
+    for _ in range(10):
+        policy.record_latency(0.01)
+    assert policy.hedge_delay() == 0.5
+
+
+def test_budget_limits_hedges_to_a_fraction_of_requests():
+    policy = HedgePolicy("agent")
+    granted = []
+    for _ in range(12):
+        policy.on_request()
+        granted.append(policy.try_acquire_hedge())
+    # The starting token, then one hedge every fourth request
+    assert granted == [True, False, False, True] + [False, False, False, True] * 2
+    assert (policy.hedges_sent, policy.budget_denied) == (4, 8)
+
+
+def test_banked_tokens_are_capped():
+    policy = HedgePolicy("agent")
+    for _ in range(100):
+        policy.on_request()
+    hedges = 0
+    while policy.try_acquire_hedge():
+        hedges += 1
+    assert hedges == MAX_HEDGE_TOKENS
+    assert policy.stats()["budget_denied"] == 1
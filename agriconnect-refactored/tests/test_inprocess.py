@@ -0,0 +1,67 @@
+# tests/test_inprocess.py
+
+import asyncio
+
+import pytest
+
+from gateway_server.inprocess import InProcessAgentResponse
+
+
+def agent_app(delays: list[float], chunk: bytes = b"data: update\n\n"):
+    """An agent that waits delays[0] before replying and delays[i] before each further chunk."""
+    async def app(scope, receive, send):
+        await asyncio.sleep(delays[0])
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        for delay in delays[1:]:
+            await asyncio.sleep(delay)
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+    return app
+
+
+def run(app, timeout: float) -> tuple[InProcessAgentResponse, list[dict], list[InProcessAgentResponse]]:
+    sent, finished = [], []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    async def scenario():
+        response = InProcessAgentResponse(app, body=b"{}", timeout=timeout)
+        response.finish_callbacks.append(finished.append)
+        await response({"type": "http", "path": "/invoke/", "raw_path": b"/invoke/"}, receive, send)
+        return response
+
+    return asyncio.run(scenario()), sent, finished
+
+
+def test_stall_before_reply_gets_504():
+    response, sent, finished = run(agent_app([1.0]), timeout=0.05)
+    assert response.status_code == 504
+    assert sent[0] == {"type": "http.response.start", "status": 504, "headers": [(b"content-type", b"text/plain; charset=utf-8")]}
+    assert finished == [response] and response.headers_at is None
+
+
+def test_slow_but_steady_stream_is_not_cut_off():
+    # 0.2 s in total, but no gap is longer than the timeout
+    response, sent, _ = run(agent_app([0.02] * 10), timeout=0.1)
+    assert response.status_code == 200
+    assert sent[-1] == {"type": "http.response.body", "body": b""}
+    assert response.response_bytes == 9 * len(b"data: update\n\n")
+
+
+def test_stall_mid_stream_ends_the_response():
+    response, sent, finished = run(agent_app([0.0, 0.0, 1.0]), timeout=0.05)
+    assert response.status_code == 200
+    assert [m.get("more_body") for m in sent[1:]] == [True]
+    assert finished == [response]
+
+
+def test_timeout_raised_by_the_agent_itself_propagates():
+    async def app(scope, receive, send):
+        raise TimeoutError("agent's own call timed out")
+
+    with pytest.raises(TimeoutError, match="agent's own"):
+        run(app, timeout=5.0)
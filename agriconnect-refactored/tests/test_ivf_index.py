@@ -0,0 +1,100 @@
+# tests/test_ivf_index.py
+
+import numpy as np
+import pytest
+
+from mcp_server.agent_index import l2_normalize
+from mcp_server.ivf_index import IVFIndex
+
+DIM = 16
+
+
+@pytest.fixture
+def vectors():
+    rng = np.random.default_rng(7)
+    return l2_normalize(rng.normal(size=(300, DIM)).astype(np.float32))
+
+
+def exhaustive_index(vectors: np.ndarray, n_ids: int | None = None) -> IVFIndex:
+    # Probing every list makes the search exact, so results can be compared to brute force
+    index = IVFIndex.train(vectors, n_lists=8, n_probe=8)
+    n_ids = len(vectors) if n_ids is None else n_ids
+    index.insert(np.arange(n_ids), vectors[:n_ids])
+    return index
+
+
+def brute_force(vectors: np.ndarray, ids, query: np.ndarray, k: int) -> list[int]:
+    ids = np.asarray(ids)
+    scores = vectors[ids] @ query
+    return ids[np.argsort(-scores)[:k]].tolist()
+
+
+def test_search_matches_brute_force(vectors):
+    index = exhaustive_index(vectors)
+    assert len(index) == 300
+    for query in vectors[:5] * 0.9 + vectors[5:10] * 0.1:
+        ids, scores = index.search(query, k=5)
+        assert ids.tolist() == brute_force(vectors, range(300), l2_normalize(query), 5)
+        assert np.all(np.diff(scores) <= 0)
+
+
+def test_insert_replaces_an_existing_id(vectors):
+    index = exhaustive_index(vectors)
+    index.insert([3], vectors[200])
+    assert len(index) == 300
+    ids, scores = index.search(vectors[200], k=2)
+    assert set(ids.tolist()) == {3, 200}
+    assert scores[0] == pytest.approx(1.0)
+    # The old vector of id 3 is gone
+    assert index.search(vectors[3], k=1)[0][0] != 3
+
+
+def test_empty_insert_is_a_no_op(vectors):
+    index = exhaustive_index(vectors, n_ids=10)
+    index.insert([], np.empty((0, DIM), dtype=np.float32))
+    assert len(index) == 10
+
+
+def test_delete_and_compact(vectors):
+    index = exhaustive_index(vectors)
+    index.delete([0, 1, 999])  # Unknown ids are ignored
+    assert len(index) == 298
+    assert index._dead == 2
+    assert 0 not in index.search(vectors[0], k=10)[0]
+
+    # Past COMPACT_DEAD_FRACTION of the stored rows the dead rows are dropped
+    deleted = list(range(2, 80))
+    index.delete(deleted)
+    assert index._dead == 0 and index._size == 220
+    remaining = list(range(80, 300))
+    for query in vectors[[0, 100, 250]]:
+        assert index.search(query, k=5)[0].tolist() == brute_force(vectors, remaining, query, 5)
+
+    # Rows freed by compaction are reused by later inserts
+    index.insert(deleted, vectors[deleted])
+    assert len(index) == 298
+    assert index.search(vectors[40], k=1)[0].tolist() == [40]
+
+
+def test_grows_past_its_initial_capacity(vectors):
+    index = exhaustive_index(vectors)
+    more = l2_normalize(np.random.default_rng(8).normal(size=(1500, DIM)).astype(np.float32))
+    index.insert(np.arange(1000, 2500), more)
+    assert len(index) == 1800
+    assert index.search(more[1234], k=1)[0].tolist() == [2234]
+    assert index.search(vectors[17], k=1)[0].tolist() == [17]
+
+
+def test_copy_is_independent(vectors):
+    index = exhaustive_index(vectors, n_ids=100)
+    clone = index.copy()
+    clone.insert([500], vectors[250])
+    clone.delete(list(range(50)))
+    index.insert([7], vectors[260])
+
+    assert len(index) == 100 and len(clone) == 51
+    assert index.search(vectors[250], k=1)[0][0] != 500
+    assert index.search(vectors[10], k=1)[0].tolist() == [10]
+    assert clone.search(vectors[250], k=1)[0].tolist() == [500]
+    assert clone.search(vectors[260], k=1)[0][0] != 7
+    assert 10 not in clone.search(vectors[10], k=5)[0]
@@ -0,0 +1,45 @@
+# tests/test_lexical_index.py
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from mcp_server.lexical_index import LexicalIndex
+
+AGENT_CARDS_DIR = Path(__file__).resolve().parent.parent / "agent_cards"
+
+
+@pytest.mark.parametrize(
+    "scores, confident",
+    [
+        ([], False),
+        ([0.0, 0.0, 0.0], False),
+        ([3.0], True),              # A single card only needs the minimum score
+        ([0.5], False),
+        ([4.0, 2.0, 0.1], True),    # Exactly the margin
+        ([4.0, 2.1, 0.1], False),
+        ([0.1, 4.0, 1.0], True),    # The winner's position does not matter
+        ([0.8, 0.1], False),        # Clear winner, but too weak
+        ([2.0, 2.0], False),        # Tie
+    ],
+)
+def test_is_confident(scores, confident):
+    assert LexicalIndex.is_confident(np.asarray(scores, dtype=np.float32), min_score=1.0, margin=2.0) is confident
+
+
+def test_confidence_on_the_agent_cards():
+    cards = [json.loads(path.read_text(encoding="utf-8")) for path in sorted(AGENT_CARDS_DIR.glob("*.json"))]
+    index = LexicalIndex(cards)
+
+    scores = index.scores("find buyers for my tomatoes")
+    best = int(np.argmax(scores))
+    assert "buyer" in cards[best]["name"]
+    assert LexicalIndex.is_confident(scores, min_score=1.0, margin=2.0)
+    assert index.coverage("find buyers for my tomatoes", best) > 0
+
+    # 'track' alone makes one card a clear BM25 winner; the query's other terms are nowhere in it
+    off_topic = index.scores("track my amazon parcel")
+    assert LexicalIndex.is_confident(off_topic, min_score=1.0, margin=2.0)
+    assert index.coverage("track my amazon parcel", int(np.argmax(off_topic))) < 0.6
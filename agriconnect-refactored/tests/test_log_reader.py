@@ -0,0 +1,70 @@
+# tests/test_log_reader.py
+
+import pytest
+
+from gateway_server.log_reader import RangeNotSatisfiable, _find_tail_offset, parse_range_header
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("bytes=0-9", (0, 9)),
+        ("bytes=10-", (10, 99)),  # Open-ended
+        ("bytes=90-500", (90, 99)),  # End past the file is clamped
+        ("bytes=-10", (90, 99)),  # Suffix
+        ("bytes=-500", (0, 99)),  # Suffix longer than the file
+        (" bytes=5-5 ", (5, 5)),
+    ],
+)
+def test_parse_range_header(header, expected):
+    assert parse_range_header(header, 100) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=0-1,5-6", "bytes=-", "items=0-9", "bytes=a-b", ""])
+def test_unsupported_range_serves_the_whole_file(header):
+    assert parse_range_header(header, 100) is None
+
+
+@pytest.mark.parametrize(
+    "header, file_size",
+    [
+        ("bytes=100-", 100),  # Starts past the end
+        ("bytes=9-3", 100),  # End before start
+        ("bytes=-0", 100),  # Empty suffix
+        ("bytes=-10", 0),  # Suffix of an empty file
+        ("bytes=0-", 0),
+    ],
+)
+def test_unsatisfiable_range(header, file_size):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range_header(header, file_size)
+
+
+def write_lines(path, count: int, trailing_newline: bool = True) -> bytes:
+    data = "\n".join(f"line {i}" for i in range(count)).encode()
+    if trailing_newline:
+        data += b"\n"
+    path.write_bytes(data)
+    return data
+
+
+@pytest.mark.parametrize("trailing_newline", [True, False])
+def test_find_tail_offset(tmp_path, trailing_newline):
+    path = tmp_path / "app.log"
+    data = write_lines(path, 10, trailing_newline)
+    assert data[_find_tail_offset(path, 3):].decode().split() == ["line", "7", "line", "8", "line", "9"]
+    assert _find_tail_offset(path, 10) == 0
+    assert _find_tail_offset(path, 50) == 0
+
+
+def test_find_tail_offset_across_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr("gateway_server.log_reader.CHUNK_SIZE", 16)
+    path = tmp_path / "app.log"
+    data = write_lines(path, 100)
+    assert data[_find_tail_offset(path, 2):] == b"line 98\nline 99\n"
+
+
+def test_find_tail_offset_empty_file(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_bytes(b"")
+    assert _find_tail_offset(path, 5) == 0
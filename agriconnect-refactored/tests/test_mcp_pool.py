@@ -0,0 +1,179 @@
+# tests/test_mcp_pool.py
+
+import asyncio
+import contextlib
+import sys
+import types
+
+import pytest
+
+from conftest import load_module
+
+
+class FakeMcpServer:
+    """Stands in for the mcp package: counts connects and lets a test script failures."""
+
+    def __init__(self):
+        self.connects = 0
+        self.pings = 0
+        self.connect_error: Exception | None = None
+        self.call_error: Exception | None = None
+        self.call_delay = 0.01
+        self.ping_error: Exception | None = None
+
+    def modules(self) -> dict:
+        server = self
+
+        class ClientSession:
+            def __init__(self, read_stream, write_stream):
+                pass
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc_info):
+                return False
+
+            async def initialize(self):
+                pass
+
+            async def call_tool(self, name, arguments):
+                await asyncio.sleep(server.call_delay)
+                if server.call_error is not None:
+                    error, server.call_error = server.call_error, None
+                    raise error
+                return types.SimpleNamespace(content=[types.SimpleNamespace(text=arguments["query"])])
+
+            async def send_ping(self):
+                server.pings += 1
+                if server.ping_error is not None:
+                    raise server.ping_error
+
+        @contextlib.asynccontextmanager
+        async def sse_client(url, timeout):
+            server.connects += 1
+            if server.connect_error is not None:
+                raise server.connect_error
+            yield (None, None)
+
+        mcp = types.ModuleType("mcp")
+        mcp.ClientSession = ClientSession
+        sse = types.ModuleType("mcp.client.sse")
+        sse.sse_client = sse_client
+        return {"mcp": mcp, "mcp.client": types.ModuleType("mcp.client"), "mcp.client.sse": sse}
+
+
+@pytest.fixture
+def fake_server(monkeypatch):
+    server = FakeMcpServer()
+    for name, module in server.modules().items():
+        monkeypatch.setitem(sys.modules, name, module)
+    return server
+
+
+@pytest.fixture
+def mcp_pool(fake_server):
+    return load_module("agents/agriconnect_orchestrator/mcp_pool.py", "mcp_pool")
+
+
+def call(pool, query: str):
+    return pool.call_tool("find_agent", {"query": query})
+
+
+def test_concurrent_calls_share_pooled_sessions(fake_server, mcp_pool):
+    async def scenario():
+        pool = mcp_pool.McpSessionPool("http://mcp.test/sse", size=2, idle_ping_interval=0)
+        results = await asyncio.gather(*(call(pool, f"q{i}") for i in range(10)))
+        for i in range(5):
+            await call(pool, f"s{i}")
+        await pool.aclose()
+        return results, pool.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert [r.content[0].text for r in results] == [f"q{i}" for i in range(10)]
+    assert fake_server.connects == 2
+    assert stats["calls"] == 15 and stats["reconnects"] == 0
+
+
+def test_transport_error_reconnects_and_retries(fake_server, mcp_pool):
+    async def scenario():
+        pool = mcp_pool.McpSessionPool("http://mcp.test/sse", size=1, idle_ping_interval=0)
+        await call(pool, "warm")
+        fake_server.call_error = ConnectionResetError("stream closed")
+        result = await call(pool, "retry")
+        await pool.aclose()
+        return result, pool.stats()
+
+    result, stats = asyncio.run(scenario())
+    assert result.content[0].text == "retry"
+    assert fake_server.connects == 2
+    assert stats["reconnects"] == 1
+
+
+def test_tool_error_keeps_the_session(fake_server, mcp_pool):
+    async def scenario():
+        pool = mcp_pool.McpSessionPool("http://mcp.test/sse", size=1, idle_ping_interval=0)
+        await call(pool, "warm")
+        fake_server.call_error = RuntimeError("tool failed")
+        with pytest.raises(RuntimeError):
+            await call(pool, "bad")
+        await call(pool, "after")
+        await pool.aclose()
+        return pool.stats()
+
+    stats = asyncio.run(scenario())
+    assert fake_server.connects == 1
+    assert stats["reconnects"] == 0
+
+
+def test_call_timeout_keeps_the_session(fake_server, mcp_pool, monkeypatch):
+    monkeypatch.setattr(mcp_pool.settings, "ORCHESTRATOR_MCP_CALL_TIMEOUT", 0.05)
+
+    async def scenario():
+        pool = mcp_pool.McpSessionPool("http://mcp.test/sse", size=1, idle_ping_interval=0)
+        await call(pool, "warm")
+        fake_server.call_delay = 0.2
+        with pytest.raises(asyncio.TimeoutError):
+            await call(pool, "slow")
+        fake_server.call_delay = 0.01
+        await call(pool, "after")
+        await pool.aclose()
+        return pool.stats()
+
+    stats = asyncio.run(scenario())
+    assert fake_server.connects == 1
+    assert stats["reconnects"] == 0
+
+
+def test_connect_failure_is_retried_once(fake_server, mcp_pool):
+    fake_server.connect_error = ConnectionRefusedError("mcp server down")
+
+    async def scenario():
+        pool = mcp_pool.McpSessionPool("http://mcp.test/sse", size=1, idle_ping_interval=0)
+        with pytest.raises(ConnectionError):
+            await call(pool, "q")
+        await pool.aclose()
+        return pool.stats()
+
+    stats = asyncio.run(scenario())
+    assert fake_server.connects == 2
+    assert stats["open_sessions"] == 0
+
+
+def test_failed_ping_drops_idle_session(fake_server, mcp_pool):
+    async def scenario():
+        pool = mcp_pool.McpSessionPool("http://mcp.test/sse", size=1, idle_ping_interval=0.05)
+        await call(pool, "warm")
+        await asyncio.sleep(0.2)
+        healthy = pool.stats()["open_sessions"]
+        fake_server.ping_error = ConnectionError("dead")
+        await asyncio.sleep(0.2)
+        dropped = pool.stats()["open_sessions"]
+        await call(pool, "again")
+        await pool.aclose()
+        return healthy, dropped
+
+    healthy, dropped = asyncio.run(scenario())
+    assert fake_server.pings >= 1
+    assert (healthy, dropped) == (1, 0)
+    assert fake_server.connects == 2
@@ -0,0 +1,77 @@
+# tests/test_micro_batcher.py
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from mcp_server.micro_batcher import EmbeddingBatcher
+
+
+class RecordingEmbedder:
+    def __init__(self, delay: float = 0.0):
+        self.calls: list[list[str]] = []
+        self.delay = delay
+
+    def __call__(self, texts: list[str]) -> list:
+        self.calls.append(texts)
+        time.sleep(self.delay)
+        return [[float(len(text))] for text in texts]
+
+
+def run_batched(embed_batch, queries: list[str], window: float, max_batch: int):
+    async def scenario():
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            batcher = EmbeddingBatcher(embed_batch, executor, window=window, max_batch=max_batch)
+            results = await asyncio.gather(*(batcher.embed(q) for q in queries), return_exceptions=True)
+            return results, batcher.stats()
+
+    return asyncio.run(scenario())
+
+
+def test_queries_in_one_window_share_a_call():
+    embedder = RecordingEmbedder()
+    results, stats = run_batched(embedder, ["onion", "price of tomato", "onion"], window=0.01, max_batch=32)
+    assert results == [[5.0], [15.0], [5.0]]
+    # The repeated query takes a single slot
+    assert embedder.calls == [["onion", "price of tomato"]]
+    assert (stats["queries"], stats["batches"], stats["max_batch_size"]) == (3, 1, 2)
+
+
+def test_full_batch_is_flushed_before_the_window_ends():
+    embedder = RecordingEmbedder()
+
+    async def scenario():
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            batcher = EmbeddingBatcher(embedder, executor, window=60.0, max_batch=2)
+            return await asyncio.wait_for(asyncio.gather(*(batcher.embed(q) for q in "abcd")), timeout=5)
+
+    assert asyncio.run(scenario()) == [[1.0]] * 4
+    assert embedder.calls == [["a", "b"], ["c", "d"]]
+
+
+def test_failed_call_reaches_every_waiter():
+    def failing(texts):
+        raise RuntimeError("quota exceeded")
+
+    results, _ = run_batched(failing, ["a", "b", "a"], window=0.01, max_batch=32)
+    assert all(isinstance(r, RuntimeError) and str(r) == "quota exceeded" for r in results)
+
+
+def test_wrong_number_of_vectors_is_an_error():
+    results, _ = run_batched(lambda texts: [[1.0]], ["a", "b"], window=0.01, max_batch=32)
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_timed_out_waiter_does_not_break_the_batch():
+    embedder = RecordingEmbedder(delay=0.1)
+
+    async def scenario():
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            batcher = EmbeddingBatcher(embedder, executor, window=0.01, max_batch=32)
+            impatient = asyncio.wait_for(batcher.embed("a"), timeout=0.05)
+            patient = batcher.embed("bb")
+            return await asyncio.gather(impatient, patient, return_exceptions=True)
+
+    impatient, patient = asyncio.run(scenario())
+    assert isinstance(impatient, asyncio.TimeoutError)
+    assert patient == [2.0]
@@ -0,0 +1,67 @@
+# tests/test_task_affinity.py
+
+import json
+
+from gateway_server.replicas import AFFINITY_SNIFF_BYTES, ReplicaSet, TaskAffinity
+
+TASK_REPLY = {"jsonrpc": "2.0", "id": 1, "result": {"kind": "task", "id": "t1", "contextId": "c1"}}
+STATUS_EVENT = {"jsonrpc": "2.0", "id": 1, "result": {"kind": "status-update", "taskId": "t1", "contextId": "c1"}}
+
+
+def bound_affinity(keys=("context:c0",)) -> tuple[TaskAffinity, ReplicaSet]:
+    replica_set = ReplicaSet("agent", ["http://a.test/", "http://b.test/"])
+    affinity = TaskAffinity(list(keys))
+    affinity.bind(replica_set, replica_set.replicas[1])
+    return affinity, replica_set
+
+
+def sse(*events) -> bytes:
+    return b"".join(f"event: message\ndata: {json.dumps(e)}\n\n".encode() for e in events)
+
+
+def test_sse_reply_split_across_chunks():
+    affinity, replica_set = bound_affinity()
+    stream = sse({"jsonrpc": "2.0", "id": 1, "result": {}}, STATUS_EVENT)
+    for i in range(0, len(stream), 7):
+        affinity.feed(stream[i:i + 7])
+    affinity.flush()
+    assert replica_set.pinned(["task:t1"]) is replica_set.replicas[1]
+    assert replica_set.pinned(["context:c1"]) is replica_set.replicas[1]
+    # The request's own key was pinned on bind
+    assert replica_set.pinned(["context:c0"]) is replica_set.replicas[1]
+
+
+def test_only_the_first_event_naming_a_task_is_learned():
+    affinity, replica_set = bound_affinity()
+    later = {"jsonrpc": "2.0", "id": 1, "result": {"kind": "task", "id": "t2"}}
+    affinity.feed(sse(STATUS_EVENT, later))
+    assert replica_set.pinned(["task:t1"]) is replica_set.replicas[1]
+    assert replica_set.pinned(["task:t2"]) is None
+
+
+def test_json_reply_is_learned_on_flush():
+    affinity, replica_set = bound_affinity()
+    body = json.dumps(TASK_REPLY, indent=2).encode()
+    half = len(body) // 2
+    affinity.feed(body[:half])
+    affinity.feed(body[half:])
+    assert replica_set.pinned(["task:t1"]) is None
+    affinity.flush()
+    assert replica_set.pinned(["task:t1"]) is replica_set.replicas[1]
+
+
+def test_learn_handles_a_buffered_reply_and_ignores_errors():
+    affinity, replica_set = bound_affinity()
+    affinity.learn(b"not json")
+    affinity.learn(json.dumps({"jsonrpc": "2.0", "id": 1, "error": {"code": -32000}}).encode())
+    affinity.learn(json.dumps(TASK_REPLY).encode())
+    assert replica_set.pinned(["context:c1"]) is replica_set.replicas[1]
+
+
+def test_reply_beyond_the_sniff_limit_is_not_parsed():
+    affinity, replica_set = bound_affinity()
+    reply = dict(TASK_REPLY, result={**TASK_REPLY["result"], "artifact": "x" * AFFINITY_SNIFF_BYTES})
+    affinity.feed(json.dumps(reply).encode())
+    affinity.flush()
+    assert replica_set.pinned(["task:t1"]) is None
+
@@ -0,0 +1,62 @@
+# tests/test_upstream.py
+
+import asyncio
+
+import httpx
+import pytest
+
+from common.settings import settings
+from gateway_server.upstream import UpstreamPool
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def test_failed_send_counts_as_error_not_hit():
+    async def scenario():
+        # Nothing listens on port 1, so the connect fails
+        pool = UpstreamPool(["http://127.0.0.1:1/"])
+        with pytest.raises(httpx.ConnectError):
+            await pool.send("GET", "http://127.0.0.1:1/")
+        stats = pool.stats()["http://127.0.0.1:1"]
+        await pool.aclose()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert (stats["requests"], stats["errors"], stats["hits"], stats["misses"]) == (1, 1, 0, 0)
+    assert stats["hit_ratio"] is None
+
+
+def test_successful_sends_count_hits():
+    async def scenario():
+        pool = UpstreamPool([], asgi_apps={"http://agent.test/": ok_app})
+        for _ in range(3):
+            response = await pool.send("GET", "http://agent.test/")
+            assert response.status_code == 200
+        stats = pool.stats()["http://agent.test:80"]
+        await pool.aclose()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert (stats["requests"], stats["hits"], stats["errors"]) == (3, 3, 0)
+    assert stats["hit_ratio"] == 1.0
+
+
+def test_inprocess_app_timeout_raises_read_timeout(monkeypatch):
+    async def stalled_app(scope, receive, send):
+        await asyncio.sleep(5)
+
+    monkeypatch.setattr(settings, "GATEWAY_UPSTREAM_TIMEOUT", 0.05)
+
+    async def scenario():
+        pool = UpstreamPool([], asgi_apps={"http://agent.test/": stalled_app})
+        with pytest.raises(httpx.ReadTimeout):
+            await pool.send("POST", "http://agent.test/", content=b"{}")
+        stats = pool.stats()["http://agent.test:80"]
+        await pool.aclose()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert (stats["requests"], stats["errors"], stats["hits"]) == (1, 1, 0)